@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# Benchmarks the Whisper Visualizer pipeline stage by stage on synthetic audio and writes
+# the results as JSON, so frames/sec and peak memory can be compared between versions.
+#
+#   python benchmark.py --duration 120 --output results.json
+#
+# Transcription uses the fake engine, which returns evenly spaced words, so that stage
+# measures everything around the model and runs offline.
+
+import os
+import sys
+import time
+import json
+import wave
+import argparse
+import platform
+import tempfile
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")  # Keep stdout clean for the JSON
+import pygame
+import imageio
+
+import whispervisualizer as wv
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ENCODE_DISTINCT_FRAMES = 30  # Frames pre-rendered for the encode stage and cycled
+
+
+def synthetic_blocks(duration, sample_rate, block_seconds=10, seed=0):
+    # Speech-like test signal: a few tones under a slow amplitude envelope, noise and
+    # short silent gaps, generated block by block so long durations stay cheap
+    rng = np.random.default_rng(seed)
+    total = int(duration * sample_rate)
+    block_len = int(block_seconds * sample_rate)
+    for start in range(0, total, block_len):
+        t = np.arange(start, min(start + block_len, total)) / sample_rate
+        tones = 0.5 * np.sin(2 * np.pi * 220 * t) + 0.3 * np.sin(2 * np.pi * 660 * t) + 0.2 * np.sin(2 * np.pi * 1760 * t)
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 0.7 * t)
+        envelope[(t % 4.0) > 3.5] = 0.0
+        signal = tones * envelope + 0.05 * rng.standard_normal(len(t))
+        yield np.clip(signal * 0.6, -1.0, 1.0).astype(np.float32)
+
+
+def write_wav(path, duration, sample_rate):
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        for block in synthetic_blocks(duration, sample_rate):
+            f.writeframes((block * 32767).astype("<i2").tobytes())
+
+
+def peak_rss_mb(who="self"):
+    # High-water mark of this process, or of its finished child processes such as ffmpeg
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN)
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024  # bytes on macOS, KiB elsewhere
+    return round(usage.ru_maxrss / scale, 1)
+
+
+def measure(stage, *args):
+    # Runs in a fresh worker process, so peak RSS belongs to this stage alone. Each stage
+    # times only its own loop and leaves setup out.
+    result = stage(*args)
+    result['peak_rss_mb'] = peak_rss_mb()
+    result['children_peak_rss_mb'] = peak_rss_mb("children")
+    return result
+
+
+def bench_decode(audio_path, duration):
+    samples = 0
+    started = time.perf_counter()
+    for block in wv.stream_audio(audio_path):
+        samples += len(block)
+    seconds = time.perf_counter() - started
+    return {'seconds': round(seconds, 4), 'samples': samples, 'realtime_factor': round(duration / seconds, 1)}
+
+
+def bench_envelope(duration, sample_rate):
+    # Envelope reduction only; the synthetic blocks stand in for decoded audio
+    blocks = list(synthetic_blocks(duration, sample_rate))
+    builder = wv.EnvelopeBuilder(sample_rate)
+    started = time.perf_counter()
+    for block in blocks:
+        builder.update(block)
+    envelope = builder.finish()
+    seconds = time.perf_counter() - started
+    return {'seconds': round(seconds, 4), 'bins': int(envelope.data.shape[0]), 'realtime_factor': round(duration / seconds, 1)}
+
+
+def bench_features(duration, sample_rate, fps):
+    # The whole single pass over stereo blocks: mix and per-channel envelopes plus the
+    # spectrum table the Spectrum style draws from
+    blocks = [np.stack([left, right], axis=1) for left, right in zip(synthetic_blocks(duration, sample_rate), synthetic_blocks(duration, sample_rate, seed=1))]
+    builder = wv.FeatureBuilder(sample_rate, channels=2, spectra=[(fps, wv.WAVEFORM_SAMPLES)])
+    started = time.perf_counter()
+    for block in blocks:
+        builder.update(block)
+    envelope = builder.finish()
+    seconds = time.perf_counter() - started
+    return {'seconds': round(seconds, 4), 'spectrum_frames': len(envelope.spectrum(fps, wv.WAVEFORM_SAMPLES)), 'realtime_factor': round(duration / seconds, 1)}
+
+
+def bench_transcribe(audio_path, stream, max_words):
+    store = wv.SegmentStore(complete=False)
+    started = time.perf_counter()
+    wv.fill_segment_store(audio_path, store, max_words, wv.load_transcriber("fake"), cache=None, stream=stream)
+    seconds = time.perf_counter() - started
+    return {'seconds': round(seconds, 4), 'subtitles': len(store)}
+
+
+def bench_frames(envelope, settings, fps, frames):
+    rasterizer = wv.WaveformRasterizer()
+    level = envelope.level_for_window(settings.window_seconds, rasterizer.num_samples)
+    total = min(frames, int(envelope.duration * fps))
+    started = time.perf_counter()
+    for frame_num in range(total):
+        wv.draw_waveform(rasterizer, envelope, level, frame_num / fps, settings)
+    seconds = time.perf_counter() - started
+    return {'seconds': round(seconds, 4), 'frames': total, 'frames_per_sec': round(total / seconds, 1)}
+
+
+def bench_subtitle_lookup(segments, duration, fps):
+    store = wv.SegmentStore(segments)
+    times = [frame_num / fps for frame_num in range(int(duration * fps))]
+    started = time.perf_counter()
+    for t in times:
+        store.text_at(t)
+    seconds = time.perf_counter() - started
+    return {'seconds': round(seconds, 4), 'lookups': len(times), 'lookups_per_sec': round(len(times) / seconds)}
+
+
+def bench_subtitle_render(segments, settings, fps, frames, cached):
+    # max_entries=0 evicts every glyph right away, i.e. the old render-every-frame path
+    pygame.font.init()
+    store = wv.SegmentStore(segments)
+    glyphs = wv.SubtitleGlyphCache(max_entries=256 if cached else 0)
+    rasterizer = wv.WaveformRasterizer()
+    started = time.perf_counter()
+    for frame_num in range(frames):
+        subtitle = store.text_at(frame_num / fps)
+        if subtitle:
+            text_surface = glyphs.render(subtitle, settings.font, settings.subtitle_color)
+            rasterizer.surface.blit(text_surface, text_surface.get_rect(center=(450, 375)))
+    seconds = time.perf_counter() - started
+    return {'seconds': round(seconds, 4), 'frames': frames, 'frames_per_sec': round(frames / seconds, 1)}
+
+
+def bench_encode(envelope, settings, fps, frames, profile_name, output_path):
+    # Encoder only, at the profile's frame size and x264 settings
+    profile = wv.build_profile(profile_name)
+    rasterizer = wv.WaveformRasterizer(profile['width'], profile['height'], profile['bars'])
+    level = envelope.level_for_window(settings.window_seconds, rasterizer.num_samples)
+    distinct = [wv.draw_waveform(rasterizer, envelope, level, n / fps, settings).copy() for n in range(ENCODE_DISTINCT_FRAMES)]
+
+    writer = imageio.get_writer(
+        output_path, fps=fps, codec='libx264', quality=None, macro_block_size=2,
+        ffmpeg_log_level='error', output_params=wv.encoder_params(profile)
+    )
+    started = time.perf_counter()
+    for frame_num in range(frames):
+        writer.append_data(distinct[frame_num % len(distinct)])
+    writer.close()
+    seconds = time.perf_counter() - started
+    return {'seconds': round(seconds, 4), 'frames': frames, 'frames_per_sec': round(frames / seconds, 1), 'bytes': os.path.getsize(output_path)}
+
+
+def bench_export(audio_path, envelope, segments, settings, profile_name, duration, output_path, soft_subtitles=False):
+    # A whole export (render, encode and audio mux) through one render tier, with the
+    # subtitles drawn into the frames or muxed as a soft subtitle stream. The envelope is
+    # loaded up front, so neither the user's envelope cache nor decoding (timed by the
+    # decode stage) affects the result.
+    soft = (lambda frame_settings: wv.subtitle_text(segments, "ass", frame_settings)) if soft_subtitles else None
+    timings = wv.export_video_file(audio_path, output_path, segments, settings, show_progress=False, profile=profile_name, soft_subtitles=soft, envelope=envelope)
+    seconds = timings['render']
+    return {
+        'seconds': round(seconds, 4),
+        'frames': timings['frames'],
+        'frames_per_sec': round(timings['frames'] / timings['render'], 1),
+        'realtime_factor': round(duration / seconds, 1),
+        'bytes': os.path.getsize(output_path),
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark each stage of the Whisper Visualizer pipeline on synthetic audio.")
+    parser.add_argument("--duration", type=float, default=60.0, help="Length of the synthetic audio in seconds")
+    parser.add_argument("--sample-rate", type=int, default=44100, help="Sample rate of the synthetic audio")
+    parser.add_argument("--frames", type=int, default=300, help="Frames per render/encode stage")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--window-seconds", type=wv.positive_float, default=1.0, help="Seconds of audio shown across the canvas")
+    parser.add_argument("--max-words", type=int, default=10, help="Max words per subtitle")
+    parser.add_argument("--profile", default=wv.DEFAULT_PROFILE, choices=list(wv.RENDER_PROFILES), help="Render profile for the encode stage")
+    parser.add_argument("--export-seconds", type=float, default=10.0, help="Length of the audio exported through every render tier")
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    work_dir = tempfile.mkdtemp(prefix="wv-benchmark-")
+    try:
+        audio_path = os.path.join(work_dir, "synthetic.wav")
+        write_wav(audio_path, args.duration, args.sample_rate)
+        export_audio_path = os.path.join(work_dir, "export.wav")
+        write_wav(export_audio_path, args.export_seconds, args.sample_rate)
+
+        # Shared inputs are prepared once up front and kept out of the timings; the
+        # envelope is cached on disk so worker processes memory-map it by path
+        envelope_cache = wv.EnvelopeCache(os.path.join(work_dir, "envelopes"))
+        envelope = wv.load_envelope(audio_path, envelope_cache, spectrum=(args.fps, wv.WAVEFORM_SAMPLES))
+        export_envelope = wv.load_envelope(export_audio_path, envelope_cache)
+        segments = wv.chunk_segments(wv.transcribe_audio(audio_path, wv.load_transcriber("fake"), cache=None), args.max_words)
+        settings = wv.RenderSettings(window_seconds=args.window_seconds, fps=args.fps)
+
+        stages = [
+            ("decode", bench_decode, (audio_path, args.duration)),
+            ("envelope", bench_envelope, (args.duration, args.sample_rate)),
+            ("features", bench_features, (args.duration, args.sample_rate, args.fps)),
+            ("transcribe", bench_transcribe, (audio_path, False, args.max_words)),
+            ("transcribe_stream", bench_transcribe, (audio_path, True, args.max_words)),
+        ]
+        for style in wv.WAVEFORM_STYLES:
+            for rainbow in (False, True):
+                name = f"render_{style.lower()}" + ("_rainbow" if rainbow else "")
+                stages.append((name, bench_frames, (envelope, settings.replace(style=style, rainbow=rainbow), args.fps, args.frames)))
+        stages += [
+            ("subtitle_lookup", bench_subtitle_lookup, (segments, args.duration, args.fps)),
+            ("subtitle_render", bench_subtitle_render, (segments, settings, args.fps, args.frames, True)),
+            ("subtitle_render_uncached", bench_subtitle_render, (segments, settings, args.fps, args.frames, False)),
+            ("encode", bench_encode, (envelope, settings, args.fps, args.frames, args.profile, os.path.join(work_dir, "encode.mp4"))),
+        ]
+        export_segments = [segment for segment in segments if segment['start'] < args.export_seconds]
+        for profile_name in wv.RENDER_PROFILES:
+            output_path = os.path.join(work_dir, f"export_{profile_name}.mp4")
+            stages.append((f"export_{profile_name}", bench_export, (export_audio_path, export_envelope, export_segments, settings, profile_name, args.export_seconds, output_path)))
+        output_path = os.path.join(work_dir, f"export_{args.profile}_soft.mp4")
+        stages.append((f"export_{args.profile}_soft_subtitles", bench_export, (export_audio_path, export_envelope, export_segments, settings, args.profile, args.export_seconds, output_path, True)))
+
+        results = {}
+        for name, stage, stage_args in stages:
+            print(f"{name}...", file=sys.stderr)
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                results[name] = pool.submit(measure, stage, *stage_args).result()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pygame': pygame.version.ver,
+        'config': vars(args),
+        'stages': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+import whispervisualizer as wv
+
+
+def finish_segment(checkpoint, index):
+    with open(os.path.join(checkpoint.directory, f"segment_{index:05d}.mp4"), "wb") as f:
+        f.write(b"video")
+    checkpoint.mark_done(index, 0, 30, "subtitles")
+
+
+def test_resumes_finished_segments(tmp_path):
+    checkpoint = wv.ExportCheckpoint("out.mp4", "a" * 64, exports_dir=str(tmp_path))
+    finish_segment(checkpoint, 0)
+    checkpoint.release()
+
+    resumed = wv.ExportCheckpoint("out.mp4", "a" * 64, exports_dir=str(tmp_path))
+    assert resumed.is_done(0, 0, 30, "subtitles")
+    assert not resumed.is_done(0, 0, 30, "other subtitles")
+    resumed.remove()
+    assert os.listdir(tmp_path) == []
+
+
+def test_same_output_and_settings_is_refused_while_running(tmp_path):
+    running = wv.ExportCheckpoint("out.mp4", "a" * 64, exports_dir=str(tmp_path))
+    with pytest.raises(RuntimeError):
+        wv.ExportCheckpoint("out.mp4", "a" * 64, exports_dir=str(tmp_path))
+    running.release()
+    wv.ExportCheckpoint("out.mp4", "a" * 64, exports_dir=str(tmp_path)).release()
+
+
+def test_other_settings_keep_a_running_export(tmp_path):
+    running = wv.ExportCheckpoint("out.mp4", "a" * 64, exports_dir=str(tmp_path))
+    finish_segment(running, 0)
+
+    other = wv.ExportCheckpoint("out.mp4", "b" * 64, exports_dir=str(tmp_path))
+    assert running.is_done(0, 0, 30, "subtitles")
+    other.release()
+    running.release()
+
+    # Once nothing holds it, a run with new settings drops the old checkpoint
+    newest = wv.ExportCheckpoint("out.mp4", "c" * 64, exports_dir=str(tmp_path))
+    assert os.listdir(tmp_path) == [os.path.basename(newest.directory)]
+    newest.release()
+
+
+def test_other_outputs_are_left_alone(tmp_path):
+    first = wv.ExportCheckpoint("first.mp4", "a" * 64, exports_dir=str(tmp_path))
+    first.release()
+    wv.ExportCheckpoint("second.mp4", "b" * 64, exports_dir=str(tmp_path)).release()
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_every_export_cleans_stale_exports(monkeypatch):
+    class Cleaned(Exception):
+        pass
+
+    def clean_stale_exports():
+        raise Cleaned
+
+    monkeypatch.setattr(wv, "clean_stale_exports", clean_stale_exports)
+    with pytest.raises(Cleaned):
+        wv.export_video_file("in.wav", "out.mp4", None, wv.RenderSettings(), show_progress=False, checkpoint=False)
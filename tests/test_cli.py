@@ -0,0 +1,22 @@
+import pytest
+
+import whispervisualizer as wv
+
+
+@pytest.mark.parametrize("option", [
+    ["--resolution", "4000x3000"],
+    ["--resolution", "wide"],
+    ["--fps", "0"],
+    ["--color", "notacolor"],
+    ["--subtitle-color", "notacolor"],
+    ["--window-seconds", "0"],
+    ["--window-seconds", "-1"],
+    ["--window-seconds", "nan"],
+])
+def test_bad_render_options_are_usage_errors(tmp_path, capsys, option):
+    # Reported by argparse before anything runs, not as a traceback from the first job
+    with pytest.raises(SystemExit) as exit_info:
+        wv.main(["render", str(tmp_path / "in.wav"), str(tmp_path / "out.mp4"), "--engine", "fake"] + option)
+    assert exit_info.value.code == 2
+    assert "error:" in capsys.readouterr().err
+    assert not (tmp_path / "out.mp4").exists()
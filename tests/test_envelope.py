@@ -0,0 +1,127 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+import whispervisualizer as wv
+
+SAMPLE_RATE = 44100
+
+
+def impulse_envelope(impulse_seconds, duration=30):
+    # Silence with a single full-scale sample
+    signal = np.zeros(int(duration * SAMPLE_RATE), dtype=np.float32)
+    signal[int(impulse_seconds * SAMPLE_RATE)] = 1.0
+    return wv.AmplitudeEnvelope.from_blocks([signal], SAMPLE_RATE)
+
+
+@pytest.mark.parametrize("profile", list(wv.RENDER_PROFILES))
+@pytest.mark.parametrize("window_seconds", wv.WAVEFORM_WINDOWS)
+@pytest.mark.parametrize("fraction", [0.1, 0.5, 0.9])
+def test_window_covers_requested_seconds(profile, window_seconds, fraction):
+    # An impulse a given fraction into the window lands in that fraction of the bars,
+    # for every zoom window at every profile's bar count
+    bars = wv.RENDER_PROFILES[profile]['bars']
+    envelope = impulse_envelope(12.0)
+    level = envelope.level_for_window(window_seconds, bars)
+    peaks, _ = envelope.bar_peaks(level, 12.0 - fraction * window_seconds, window_seconds, bars)
+    assert len(peaks) == bars
+    # Bar edges are exact to one bin of the chosen level; bars narrower than a bin share it
+    lit = np.flatnonzero(peaks)
+    tolerance = 1 + envelope.bin_size(level) / (window_seconds * SAMPLE_RATE / bars)
+    assert len(lit) and all(abs(bar - fraction * bars) <= tolerance for bar in lit)
+
+
+@pytest.mark.parametrize("window_seconds", wv.WAVEFORM_WINDOWS)
+def test_window_excludes_audio_outside_it(window_seconds):
+    envelope = impulse_envelope(12.0)
+    level = envelope.level_for_window(window_seconds)
+    margin = envelope.bin_size(level) / SAMPLE_RATE
+    before, _ = envelope.bar_peaks(level, 12.0 + margin, window_seconds, wv.WAVEFORM_SAMPLES)
+    after, _ = envelope.bar_peaks(level, 12.0 - window_seconds - margin, window_seconds, wv.WAVEFORM_SAMPLES)
+    assert not before.any() and not after.any()
+
+
+def test_short_windows_differ():
+    # 0.25 s and 0.5 s used to snap to the same bin span
+    envelope = impulse_envelope(12.0)
+    quarter, _ = envelope.bar_peaks(envelope.level_for_window(0.25), 11.9, 0.25, wv.WAVEFORM_SAMPLES)
+    half, _ = envelope.bar_peaks(envelope.level_for_window(0.5), 11.9, 0.5, wv.WAVEFORM_SAMPLES)
+    assert np.flatnonzero(quarter)[0] != np.flatnonzero(half)[0]
+
+
+def test_window_is_clipped_at_the_end():
+    envelope = impulse_envelope(1.0, duration=2)
+    peaks, _ = envelope.bar_peaks(0, 1.5, 1.0, wv.WAVEFORM_SAMPLES)
+    assert 95 <= len(peaks) <= 101
+    peaks, _ = envelope.bar_peaks(0, 3.0, 1.0, wv.WAVEFORM_SAMPLES)
+    assert len(peaks) == 0
+
+
+def sine(hz, seconds, sample_rate=SAMPLE_RATE):
+    return np.sin(2 * np.pi * hz * np.arange(int(seconds * sample_rate)) / sample_rate).astype(np.float32)
+
+
+@pytest.mark.parametrize("hz", [100, 1000, 8000])
+@pytest.mark.parametrize("fps", [24, 30])
+def test_sine_lands_in_its_spectrum_band(hz, fps):
+    # Fed in uneven blocks; away from the padded ends every frame peaks in the band
+    # holding the sine's FFT bin, and a full-scale sine reads well above the floor there
+    signal = sine(hz, 2.013)
+    builder = wv.SpectrumBuilder(SAMPLE_RATE, fps, 64)
+    for start in range(0, len(signal), 7777):
+        builder.update(signal[start:start + 7777])
+    table = builder.finish()
+    assert table.shape == (-(-len(signal) * fps // SAMPLE_RATE), 64)
+
+    sine_bin = round(hz * builder.fft_size / SAMPLE_RATE)
+    band = int(np.flatnonzero((builder.band_starts <= sine_bin) & (sine_bin < builder.band_stops))[0])
+    middle = table[fps // 2:-fps // 2]
+    assert (middle.argmax(axis=1) == band).all()
+    assert (middle[:, band] > 128).all()
+
+
+def stereo_builder(left, right, spectra=()):
+    builder = wv.FeatureBuilder(SAMPLE_RATE, channels=2, spectra=spectra)
+    builder.update(np.stack([left, right], axis=1))
+    return builder.finish()
+
+
+def test_feature_builder_keeps_channels_apart():
+    left = sine(440, 1.0)
+    envelope = stereo_builder(left, np.zeros_like(left))
+    assert envelope.channels == 2
+    assert np.abs(envelope.channel(0).data).max() == pytest.approx(1.0, abs=1e-3)
+    assert not envelope.channel(1).data.any()
+    # The mix is ffmpeg's stereo downmix of the two
+    assert envelope.data[:, wv.ENVELOPE_MAX].max() == pytest.approx(wv.STEREO_MIX_GAIN, abs=1e-3)
+
+
+def test_envelope_cache_round_trips_channels_and_spectra(tmp_path):
+    cache = wv.EnvelopeCache(str(tmp_path))
+    left = sine(440, 1.0)
+    right = 0.25 * sine(3000, 1.0)
+    envelope = stereo_builder(left, right, spectra=[(30, 40)])
+    saved = cache.put("entry", envelope)
+    assert saved.path is not None
+    assert sorted(os.listdir(tmp_path)) == ["entry.channels.npy", "entry.json", "entry.npy", "entry.spectrum-30-40.npy"]
+
+    loaded = cache.get("entry")
+    assert np.array_equal(loaded.data, envelope.data)
+    assert np.array_equal(loaded.channel_data, envelope.channel_data)
+    assert np.array_equal(loaded.spectrum(30, 40), envelope.spectrum(30, 40))
+
+    # A table added to a cached entry is written next to it; the other files are kept
+    written = {name: os.path.getmtime(tmp_path / name) for name in os.listdir(tmp_path)}
+    spectrum = wv.SpectrumBuilder(SAMPLE_RATE, 15, 20)
+    spectrum.update((left + right) * np.float32(wv.STEREO_MIX_GAIN))
+    loaded.spectra[(15, 20)] = spectrum.finish()
+    time.sleep(0.01)
+    cache.put("entry", loaded)
+    reloaded = cache.get("entry")
+    assert np.array_equal(reloaded.spectrum(15, 20), loaded.spectra[(15, 20)])
+    assert np.array_equal(reloaded.spectrum(30, 40), envelope.spectrum(30, 40))
+    assert np.array_equal(reloaded.channel_data, envelope.channel_data)
+    for name in ("entry.npy", "entry.channels.npy", "entry.spectrum-30-40.npy"):
+        assert os.path.getmtime(tmp_path / name) == written[name]
@@ -0,0 +1,104 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+import wave
+
+import pytest
+
+import whispervisualizer as wv
+
+
+@pytest.fixture
+def jobs(tmp_path):
+    args = wv.build_parser().parse_args(["serve", "--output-dir", str(tmp_path / "out"), "--no-cache"])
+    return wv.JobQueue(args, jobs_dir=str(tmp_path / "jobs"))
+
+
+@pytest.fixture
+def audio(tmp_path):
+    path = tmp_path / "in.wav"
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(16000)
+        f.writeframes(b"\0\0" * 16000)
+    return str(path)
+
+
+def test_submit_accepts_valid_options(jobs, audio):
+    job = jobs.submit({'input': audio, 'rainbow': False, 'max_words': 3, 'amplitude_scale': 2, 'style': "bar"})
+    assert job['status'] == "queued"
+    assert job['options'] == {'rainbow': False, 'max_words': 3, 'amplitude_scale': 2.0, 'style': "bar"}
+
+
+@pytest.mark.parametrize("options", [
+    {'rainbow': "false"},
+    {'rainbow': 0},
+    {'stream': "yes"},
+    {'max_words': 0},
+    {'max_words': -2},
+    {'max_words': 2.5},
+    {'max_words': True},
+    {'max_words': "4"},
+    {'workers': 0},
+    {'amplitude_scale': "1.5"},
+    {'amplitude_scale': False},
+    {'style': 3},
+    {'output': 5},
+    {'subtitle_color': "notacolor"},
+    {'crf': -1},
+    {'crf': 52},
+    {'window_seconds': 0},
+    {'window_seconds': -1.5},
+    {'window_seconds': float("nan")},
+])
+def test_submit_rejects_invalid_options(jobs, audio, options):
+    with pytest.raises(ValueError):
+        jobs.submit(dict(options, input=audio))
+    assert not jobs.jobs
+
+
+def test_invalid_job_gets_a_400(jobs, audio):
+    httpd = wv.ThreadingHTTPServer(("127.0.0.1", 0), wv.JobRequestHandler)
+    httpd.jobs = jobs
+    httpd.quiet = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    try:
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{httpd.server_port}/jobs", method="POST",
+            data=json.dumps({'input': audio, 'output': 5}).encode()
+        )
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(request, timeout=5)
+        assert error.value.code == 400
+        assert "output" in json.load(error.value)['error']
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+class SlowModel:
+    # Records whether two transcriptions ever overlap on one model
+    def __init__(self):
+        self.running = 0
+        self.overlapped = False
+
+    def transcribe(self, audio, **options):
+        self.running += 1
+        self.overlapped |= self.running > 1
+        time.sleep(0.05)
+        self.running -= 1
+        return {'text': '', 'language': 'en', 'segments': []}
+
+
+def test_whisper_engine_transcribes_one_call_at_a_time():
+    engine = wv.WhisperEngine("base")
+    engine.model = SlowModel()
+    threads = [threading.Thread(target=engine.transcribe, args=("audio.wav",)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not engine.model.overlapped
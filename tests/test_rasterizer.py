@@ -0,0 +1,61 @@
+import numpy as np
+import pygame
+import pytest
+
+import whispervisualizer as wv
+
+
+def pygame_frame(amplitudes, current_sample, amplitude_scale, style, color, rainbow):
+    # The original per-sample pygame.draw loop the rasterizer replaced
+    screen = pygame.Surface((900, 400))
+    screen.fill((0, 0, 0))
+    num_samples = 200
+    for i in range(current_sample, min(current_sample + num_samples, len(amplitudes))):
+        amp = amplitudes[i] * amplitude_scale
+        bar_height = int(amp * 200)
+        x_pos = int((i - current_sample) * (900 / num_samples))
+        sample_color = wv.RAINBOW_COLORS[i % len(wv.RAINBOW_COLORS)] if rainbow else color
+        if style == "Line":
+            pygame.draw.line(screen, sample_color, (x_pos, 200 - bar_height // 2), (x_pos, 200 + bar_height // 2), 2)
+        elif style == "Bar":
+            pygame.draw.rect(screen, sample_color, (x_pos, 200 - bar_height // 2, 3, bar_height))
+        elif style == "Filled":
+            pygame.draw.polygon(screen, sample_color, [(x_pos, 200), (x_pos, 200 - bar_height // 2), (x_pos + 3, 200 - bar_height // 2), (x_pos + 3, 200)])
+    return pygame.surfarray.array3d(screen).transpose(1, 0, 2)
+
+
+def noisy_amplitudes():
+    # Noise with a silent stretch in the middle, 1000 samples
+    rng = np.random.default_rng(0)
+    amplitudes = rng.random(1000).astype(np.float32)
+    amplitudes[400:650] = 0.0
+    return amplitudes
+
+
+AMPLITUDES = noisy_amplitudes()
+POSITIONS = [
+    0,      # Full window
+    420,    # Inside the silent stretch
+    300,    # Sound running into silence
+    900,    # Clipped tail: only 100 samples left
+    995,    # Clipped tail: 5 samples left
+]
+
+
+@pytest.mark.parametrize("style", ["Line", "Bar", "Filled"])
+@pytest.mark.parametrize("rainbow", [False, True])
+@pytest.mark.parametrize("amplitude_scale", [0.5, 1.0, 1.7, 3.0])
+@pytest.mark.parametrize("current_sample", POSITIONS)
+def test_render_matches_pygame(style, rainbow, amplitude_scale, current_sample):
+    rasterizer = wv.WaveformRasterizer()
+    frame = rasterizer.render(AMPLITUDES, current_sample, amplitude_scale, style, (0, 255, 0), rainbow)
+    expected = pygame_frame(AMPLITUDES, current_sample, amplitude_scale, style, (0, 255, 0), rainbow)
+    assert np.array_equal(frame, expected)
+
+
+def test_render_clears_previous_frame():
+    # The frame buffer is reused, so nothing of the previous frame may show through
+    rasterizer = wv.WaveformRasterizer()
+    rasterizer.render(AMPLITUDES, 0, 3.0, "Filled", (255, 0, 0), True)
+    frame = rasterizer.render(AMPLITUDES, 420, 1.0, "Line", (0, 255, 0), False)
+    assert np.array_equal(frame, pygame_frame(AMPLITUDES, 420, 1.0, "Line", (0, 255, 0), False))
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import wave
+
+import imageio
+import numpy as np
+import pytest
+
+import whispervisualizer as wv
+
+SAMPLE_RATE = 22050
+FPS = 15
+SETTINGS = wv.RenderSettings(width=160, height=96, bars=40, fps=FPS)
+SEGMENTS = [
+    {'start': 0.3, 'end': 1.1, 'text': "first"},
+    {'start': 1.1, 'end': 1.6, 'text': "second"},
+    {'start': 2.4, 'end': 3.5, 'text': "third"},
+]
+
+
+def stereo_signal(seconds=4):
+    # Tones in each channel with stretches of silence between them
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    left = 0.8 * np.sin(2 * np.pi * 220 * t) * (t % 1.5 < 0.9)
+    right = 0.4 * np.sin(2 * np.pi * 1760 * t) * (t % 2.0 > 1.2)
+    return np.stack([left, right], axis=1).astype(np.float32)
+
+
+def stereo_envelope(seconds=4):
+    builder = wv.FeatureBuilder(SAMPLE_RATE, channels=2, spectra=[(FPS, SETTINGS.bars)])
+    builder.update(stereo_signal(seconds))
+    return builder.finish()
+
+
+def frames(envelope, start_frame, end_frame, settings=SETTINGS, segments=SEGMENTS):
+    # The yielded buffer is reused, so each frame is copied out
+    return [frame.copy() for frame in wv.render_frames(envelope, FPS, start_frame, end_frame, settings, segments)]
+
+
+@pytest.mark.parametrize("chunk_frames", [7, 16])
+def test_chunks_match_serial_frames(chunk_frames):
+    # Each worker renders its chunk from a fresh buffer; stitched together they must be
+    # the frames a single pass draws
+    envelope = stereo_envelope()
+    total_frames = int(envelope.duration * FPS)
+    serial = frames(envelope, 0, total_frames)
+    chunked = []
+    for start_frame in range(0, total_frames, chunk_frames):
+        chunked += frames(envelope, start_frame, min(start_frame + chunk_frames, total_frames))
+    assert len(chunked) == total_frames
+    for frame_num, (expected, actual) in enumerate(zip(serial, chunked)):
+        assert np.array_equal(expected, actual), f"frame {frame_num}"
+
+
+def write_wav(path, signal):
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(signal.shape[1])
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes((signal * 32767).astype("<i2").tobytes())
+    return str(path)
+
+
+def test_parallel_render_with_quote_in_path(tmp_path, monkeypatch):
+    # Chunks are listed for the concat demuxer by path; a ' in the temp directory used to
+    # end the quoted path early
+    temp_dir = tmp_path / "it's here"
+    temp_dir.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(temp_dir))
+    audio_path = write_wav(temp_dir / "in.wav", stereo_signal(2))
+    output_path = str(temp_dir / "out.mp4")
+
+    envelope = wv.load_envelope(audio_path, cache=None)
+    total_frames = int(envelope.duration * FPS)
+    profile = wv.build_profile("draft")
+    wv.render_video_parallel(
+        output_path, audio_path, envelope, FPS, total_frames, wv.encoder_params(profile), SETTINGS,
+        SEGMENTS, workers=2, chunk_seconds=0.5, audio_params=profile['audio']
+    )
+    with imageio.get_reader(output_path) as reader:
+        assert reader.count_frames() == total_frames
+    # The chunks went to a directory under the patched temp dir and are gone again
+    assert sorted(os.listdir(temp_dir)) == ["in.wav", "out.mp4"]
+
+
+@pytest.mark.parametrize("style", wv.WAVEFORM_STYLES)
+@pytest.mark.parametrize("rainbow", [False, True])
+@pytest.mark.parametrize("amplitude_scale", [1.0, 4.0])
+def test_partial_redraw_matches_full_redraw(style, rainbow, amplitude_scale):
+    # Only changed rows are redrawn from one frame to the next; rendering each frame on its
+    # own draws it in full. The signal has silent stretches, the subtitles change, go
+    # blank and follow each other directly, and at 4x the waveform reaches into their rows.
+    envelope = stereo_envelope()
+    settings = SETTINGS.replace(style=style, rainbow=rainbow, amplitude_scale=amplitude_scale)
+    total_frames = int(envelope.duration * FPS)
+    incremental = frames(envelope, 0, total_frames, settings)
+    for frame_num, frame in enumerate(incremental):
+        assert np.array_equal(frame, frames(envelope, frame_num, frame_num + 1, settings)[0]), f"frame {frame_num}"
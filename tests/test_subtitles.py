@@ -0,0 +1,124 @@
+import random
+import re
+
+import pytest
+
+import whispervisualizer as wv
+
+
+def linear_text_at(segments, t):
+    # The original lookup: first segment (by start) showing at t
+    for segment in sorted(segments, key=lambda s: s['start']):
+        if segment['start'] <= t <= segment['end']:
+            return segment['text']
+    return ""
+
+
+def random_segments(seed, count=300):
+    # Overlapping, unordered segments; starts on a 0.5 s grid so some share a start
+    rng = random.Random(seed)
+    segments = []
+    for i in range(count):
+        start = rng.randrange(0, 400) / 2
+        segments.append({'start': start, 'end': start + rng.choice([0.0, 0.5, 1.3, 4.0, 20.0]), 'text': f"subtitle {i} ✓"})
+    return segments
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_text_at_matches_linear_scan(seed):
+    segments = random_segments(seed)
+    index = wv.SubtitleIndex(segments)
+    rng = random.Random(seed)
+    # Random times plus every start and end, where ties and boundaries matter
+    times = [rng.uniform(-5, 230) for _ in range(2000)]
+    times += [s['start'] for s in segments] + [s['end'] for s in segments]
+    for t in times:
+        assert index.text_at(t) == linear_text_at(segments, t)
+
+
+def test_text_at_after_out_of_order_extend():
+    segments = random_segments(7, count=100)
+    index = wv.SubtitleIndex()
+    store = wv.SegmentStore(complete=False)
+    for i in range(0, 100, 10):
+        index.extend(segments[i:i + 10])
+        store.extend(segments[i:i + 10], float("inf"))
+    store.finish()
+    for t in [x / 4 for x in range(-4, 900)]:
+        expected = linear_text_at(segments, t)
+        assert index.text_at(t) == expected
+        assert store.text_at(t) == expected
+
+
+def test_between_keeps_overlapping_subtitles():
+    segments = random_segments(3)
+    index = wv.SubtitleIndex(segments)
+    part = index.between(50.0, 60.0)
+    expected = sorted((s['start'], s['end'], s['text']) for s in segments if s['end'] >= 50.0 and s['start'] <= 60.0)
+    assert sorted(part.rows()) == expected
+
+
+@pytest.mark.parametrize("seconds, fmt, expected", [
+    (0.0, "srt", "00:00:00,000"),
+    (-0.2, "srt", "00:00:00,000"),
+    (59.9996, "srt", "00:01:00,000"),
+    (3599.9996, "srt", "01:00:00,000"),
+    (3661.5004, "srt", "01:01:01,500"),
+    (59.9994, "vtt", "00:00:59.999"),
+    (3599.9996, "vtt", "01:00:00.000"),
+    (59.994, "ass", "0:00:59.99"),
+    (59.996, "ass", "0:01:00.00"),
+    (3599.996, "ass", "1:00:00.00"),
+    (36000.0, "ass", "10:00:00.00"),
+])
+def test_format_timestamp_rounds_across_boundaries(seconds, fmt, expected):
+    assert wv.format_timestamp(seconds, fmt) == expected
+
+
+FORMAT_SEGMENTS = [
+    {'start': 2.0, 'end': 3.0, 'text': " fish  &  <chips>"},
+    {'start': 0.5, 'end': 1.5, 'text': " {\\b1}bold"},
+    {'start': 1.5, 'end': 2.0, 'text': "   "},
+]
+
+
+def test_srt_numbers_the_subtitles_that_are_written():
+    assert wv.subtitle_text(FORMAT_SEGMENTS, "srt") == (
+        "1\n00:00:00,500 --> 00:00:01,500\n{\\b1}bold\n\n"
+        "2\n00:00:02,000 --> 00:00:03,000\nfish & <chips>\n"
+    )
+
+
+def test_vtt_escapes_markup():
+    assert wv.subtitle_text(FORMAT_SEGMENTS, "vtt") == (
+        "WEBVTT\n\n"
+        "00:00:00.500 --> 00:00:01.500\n{\\b1}bold\n\n"
+        "00:00:02.000 --> 00:00:03.000\nfish &amp; &lt;chips&gt;\n"
+    )
+
+
+def test_ass_escapes_override_blocks():
+    dialogue = [line for line in wv.subtitle_text(FORMAT_SEGMENTS, "ass").splitlines() if line.startswith("Dialogue:")]
+    assert dialogue == [
+        "Dialogue: 0,0:00:00.50,0:00:01.50,Default,,0,0,0,,(\\b1)bold",
+        "Dialogue: 0,0:00:02.00,0:00:03.00,Default,,0,0,0,,fish & <chips>",
+    ]
+
+
+def test_karaoke_durations_cover_each_chunk():
+    words = [
+        {'word': " One", 'start': 0.004, 'end': 0.333},
+        {'word': " {two}", 'start': 0.333, 'end': 0.9},
+        {'word': " three", 'start': 1.257, 'end': 1.6},
+        {'word': " four", 'start': 1.6, 'end': 2.115},
+        {'word': " five", 'start': 59.997, 'end': 61.001},
+    ]
+    result = {'segments': [{'words': words[:4]}, {'words': words[4:]}]}
+    dialogue = [line for line in wv.karaoke_ass(result, 3).splitlines() if line.startswith("Dialogue:")]
+    chunks = [words[:3], words[3:4], words[4:]]
+    assert len(dialogue) == len(chunks)
+    for line, chunk in zip(dialogue, chunks):
+        durations = [int(k) for k in re.findall(r"\{\\k(\d+)\}", line)]
+        assert len(durations) == len(chunk)
+        assert sum(durations) == round(chunk[-1]['end'] * 100) - round(chunk[0]['start'] * 100)
+    assert "(two)" in dialogue[0]
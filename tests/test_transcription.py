@@ -0,0 +1,110 @@
+import os
+import wave
+
+import numpy as np
+import pytest
+
+import whispervisualizer as wv
+
+
+def write_wav(path, seconds, sample_rate=wv.WHISPER_SAMPLE_RATE):
+    # Quiet noise; the fake engine only looks at the length
+    rng = np.random.default_rng(0)
+    samples = (rng.standard_normal(int(seconds * sample_rate)) * 1000).astype("<i2")
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(samples.tobytes())
+    return str(path)
+
+
+@pytest.fixture
+def engine():
+    return wv.FakeEngine("test")
+
+
+def test_chunk_segments(engine):
+    result = engine.transcribe(np.zeros(10 * wv.WHISPER_SAMPLE_RATE, dtype=np.float32))
+    words = [word for segment in result['segments'] for word in segment['words']]
+    assert len(words) == 33  # One word per 0.3 s
+
+    chunks = wv.chunk_segments(result, 5)
+    # Segments hold 12, 12 and 9 words; chunks never span two segments
+    assert [len(chunk['text'].split()) for chunk in chunks] == [5, 5, 2, 5, 5, 2, 5, 4]
+    assert " ".join(chunk['text'] for chunk in chunks).split() == [word['word'].strip() for word in words]
+    assert chunks[1]['start'] == words[5]['start']
+    assert chunks[1]['end'] == words[9]['end']
+
+
+def test_chunk_segments_one_word(engine):
+    result = engine.transcribe(np.zeros(3 * wv.WHISPER_SAMPLE_RATE, dtype=np.float32))
+    chunks = wv.chunk_segments(result, 1)
+    assert [chunk['text'] for chunk in chunks] == [f" word{i}" for i in range(10)]
+
+
+def test_streamed_subtitles_keep_whole_file_order(tmp_path, engine):
+    path = write_wav(tmp_path / "speech.wav", 20)
+    whole = wv.chunk_segments(engine.transcribe(path), 4)
+
+    windows = list(wv.transcribe_windows(path, engine, window_seconds=6))
+    covered = [covered_until for _, _, covered_until in windows]
+    assert covered == sorted(covered) and covered[-1] == pytest.approx(20, abs=0.01)
+
+    streamed = wv.chunk_segments({'segments': [segment for segment, _, _ in windows for segment in segment]}, 4)
+    starts = [chunk['start'] for chunk in streamed]
+    assert starts == sorted(starts)
+    # Windows never overlap: each subtitle ends before the next one starts
+    assert all(a['end'] <= b['start'] for a, b in zip(streamed, streamed[1:]))
+    assert streamed[0]['start'] == whole[0]['start']
+    assert streamed[-1]['end'] <= 20
+    assert abs(len(streamed) - len(whole)) <= len(windows)
+
+
+def test_streamed_store_matches_whole_file_store(tmp_path, engine):
+    path = write_wav(tmp_path / "speech.wav", 12)
+    whole = wv.SegmentStore(complete=False)
+    wv.fill_segment_store(path, whole, 6, engine, cache=None)
+    streamed = wv.SegmentStore(complete=False)
+    wv.fill_segment_store(path, streamed, 6, engine, cache=None, stream=True)
+    assert whole.finished and streamed.finished
+    # Under the 30 s stream window the file is one window, so both agree exactly
+    assert streamed.index.rows() == whole.index.rows()
+
+
+class CountingEngine(wv.FakeEngine):
+    calls = 0
+
+    def transcribe(self, audio):
+        self.calls += 1
+        return super().transcribe(audio)
+
+
+def test_transcript_cache_hit_and_miss(tmp_path):
+    path = write_wav(tmp_path / "speech.wav", 3)
+    cache = wv.TranscriptCache(str(tmp_path / "cache"))
+    engine = CountingEngine("test")
+
+    first = wv.transcribe_audio(path, engine, cache)
+    second = wv.transcribe_audio(path, engine, cache)
+    assert engine.calls == 1
+    assert second == first
+
+    # A different model misses
+    wv.transcribe_audio(path, wv.FakeEngine("other"), cache)
+    assert len(os.listdir(cache.directory)) == 2
+
+
+def test_transcript_cache_evicts_least_recently_used(tmp_path):
+    cache = wv.TranscriptCache(str(tmp_path / "cache"), max_bytes=10 ** 9)
+    result = {'text': 'x' * 100, 'segments': []}
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.put(key, result)
+        os.utime(cache.entry_path(key, "json"), (1000 * (i + 1), 1000 * (i + 1)))
+    size = os.path.getsize(cache.entry_path("a", "json"))
+
+    assert cache.get("a") == result  # Reading refreshes a, so b and c are now the oldest
+    cache.max_bytes = int(size * 2.5)
+    cache.put("d", result)
+    assert sorted(os.listdir(cache.directory)) == ["a.json", "d.json"]
+    assert cache.get("b") is None
@@ -1,33 +1,1877 @@
 import os
-import whisper
-import librosa
+import sys
+import time
+import argparse
+import bisect
+import hashlib
+import json
+import multiprocessing
+import queue
+import re
+import shutil
+import subprocess
+import tempfile
+import uuid
+from array import array
+import dataclasses
 import numpy as np
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 import pygame
 import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import tkinter as tk
 from tkinter import filedialog, messagebox, colorchooser
-from PIL import Image, ImageTk
+from PIL import Image, ImageTk, ImageColor
 
 import ttkbootstrap as ttk  
 
 import imageio
 from imageio_ffmpeg import get_ffmpeg_exe  
 
-# Global variables
-audio_file = None
-segments = []
-playback_running = False
-waveform_color = (0, 255, 0)  # Default waveform color
-subtitle_color = "#00FF00"  # Default subtitle color in hex
-rainbow_effect = False  # Track if rainbow effect is enabled
-max_words = 10  # Max words per subtitle chunk
-
 FONT_OPTIONS = [
     "Arial", "Helvetica", "Courier", "Times New Roman", "Verdana",
     "Georgia", "Calibri", "Tahoma", "Comic Sans MS", "Papyrus"
 ]
 
-WAVEFORM_STYLES = ["Line", "Bar", "Filled"]
+WAVEFORM_STYLES = ["Line", "Bar", "Filled", "Stereo", "Spectrum"]
+
+WAVEFORM_SAMPLES = 200  # Samples shown per frame
+
+CANVAS_WIDTH = 900  # Preview canvas, and the frame size all other geometry is scaled from
+CANVAS_HEIGHT = 400
+
+SUBTITLE_FONT_SIZE = 18  # At CANVAS_HEIGHT; scaled with the frame height
+SUBTITLE_CENTER_Y = 15 / 16  # Vertical center of the subtitle as a fraction of the frame height
+
+RAINBOW_COLORS = [
+    (255, 0, 0),     # Red
+    (255, 127, 0),   # Orange
+    (255, 255, 0),   # Yellow
+    (0, 255, 0),     # Green
+    (0, 0, 255),     # Blue
+    (75, 0, 130),    # Indigo
+    (148, 0, 211)    # Violet
+]
+
+
+@dataclasses.dataclass(frozen=True)
+class RenderSettings:
+    # Everything a frame depends on. Frozen, so one instance can be shared by the preview
+    # thread, export threads and worker processes as is; changing a value makes a new one.
+    style: str = "Line"
+    amplitude_scale: float = 1.0
+    window_seconds: float = 1.0
+    waveform_color: tuple = (0, 255, 0)
+    rainbow: bool = False
+    font: str = "Arial"
+    subtitle_color: str = "#00FF00"  # Hex
+    width: int = CANVAS_WIDTH
+    height: int = CANVAS_HEIGHT
+    bars: int = WAVEFORM_SAMPLES
+    fps: int = 30  # Picks the per-frame spectrum table for the Spectrum style
+
+    def replace(self, **changes):
+        return dataclasses.replace(self, **changes)
+
+
+class WaveformRasterizer:
+    # Draws the waveform straight into a preallocated RGB array using NumPy masks.
+    # At 900x400 the output matches what pygame.draw.line/rect/polygon produced sample by
+    # sample, with c = height // 2 and h = int(amp * scale * c):
+    #   Line   -> columns x..x+1, rows c-h//2 .. c+h//2
+    #   Bar    -> columns x..x+2, rows c-h//2 .. c-h//2+h-1 (nothing when h == 0)
+    #   Filled -> columns x..x+3, rows c-h//2 .. c
+    # Stereo draws the left channel above the center and the right one below it
+    # (rows c-hL//2 .. c+hR//2), Spectrum draws one Line-shaped bar per frequency band.
+    # Bar widths are fractions of the spacing between samples (4.5 px at 900 / 200), so
+    # they scale with the frame size.
+    STYLE_WIDTHS = {"Line": 0.45, "Bar": 0.67, "Filled": 0.89, "Stereo": 0.67, "Spectrum": 0.78}
+
+    def __init__(self, width=CANVAS_WIDTH, height=CANVAS_HEIGHT, num_samples=WAVEFORM_SAMPLES):
+        self.width = width
+        self.height = height
+        self.num_samples = num_samples
+        self.center = height // 2
+
+        # 32-bit frame buffer shared with a pygame surface so subtitles blit in place
+        # with the same blending as a regular pygame.Surface; frame is its RGB view
+        self.buffer = np.zeros((height, width, 4), dtype=np.uint8)
+        self.surface = pygame.image.frombuffer(self.buffer, (width, height), "RGBX")
+        self.frame = self.buffer[:, :, :3]
+
+        # Which sample owns each column, per style (-1 = background)
+        spacing = width / num_samples
+        x_positions = (np.arange(num_samples) * spacing).astype(np.int64)
+        self.column_samples = {}
+        for style, fraction in self.STYLE_WIDTHS.items():
+            bar_width = max(1, round(spacing * fraction))
+            owners = np.full(width, -1, dtype=np.int64)
+            for dx in range(bar_width):
+                cols = x_positions + dx
+                valid = cols < width
+                owners[cols[valid]] = np.arange(num_samples)[valid]
+            self.column_samples[style] = owners
+
+        self.palette = np.array(RAINBOW_COLORS, dtype=np.uint8)
+
+        # Scratch buffers reused for every frame
+        self._rows = np.arange(height, dtype=np.int64)[:, None]
+        self._heights = np.zeros(num_samples, dtype=np.int64)
+        self._lower_heights = np.zeros(num_samples, dtype=np.int64)
+        self._scaled = np.zeros(num_samples, dtype=np.float64)
+        self._top = np.zeros(width, dtype=np.int64)
+        self._bottom = np.zeros(width, dtype=np.int64)
+        self._colors = np.zeros((width, 3), dtype=np.uint8)
+        self._mask = np.zeros((height, width), dtype=bool)
+        self._mask_tmp = np.zeros((height, width), dtype=bool)
+
+        # Column layout currently in the frame buffer (initially an empty, black frame)
+        self._drawn_top = np.full(width, height, dtype=np.int64)
+        self._drawn_bottom = np.full(width, -1, dtype=np.int64)
+        self._drawn_colors = np.zeros((width, 3), dtype=np.uint8)
+        self.drawn_rows = (0, 0)
+
+    def render(self, amplitudes, current_sample, amplitude_scale, style, color, rainbow, sample_offset=0, lower=None):
+        # sample_offset is the absolute index of amplitudes[0] when only a slice is passed in
+        self.layout(amplitudes, current_sample, amplitude_scale, style, color, rainbow, sample_offset, lower)
+        self.draw()
+        return self.frame
+
+    def scale_heights(self, window, amplitude_scale, heights):
+        # bar_height = int(amp * amplitude_scale * center), evaluated in float64 like the scalar path
+        scaled = self._scaled[:len(window)]
+        np.multiply(window, amplitude_scale, out=scaled, dtype=np.float64)
+        np.multiply(scaled, self.center, out=scaled)
+        heights[:] = scaled
+        return heights
+
+    def layout(self, amplitudes, current_sample, amplitude_scale, style, color, rainbow, sample_offset=0, lower=None):
+        # Computes the top/bottom row and color of every column without touching the frame.
+        # lower holds the amplitudes drawn below the center by the Stereo style (the right
+        # channel), indexed like amplitudes; without it both halves mirror amplitudes.
+        self._top.fill(self.height)
+        self._bottom.fill(-1)
+
+        start = current_sample - sample_offset
+        window = amplitudes[start:start + self.num_samples]
+        count = len(window)
+        owners = self.column_samples.get(style)
+        if count == 0 or owners is None:
+            return
+
+        heights = self.scale_heights(window, amplitude_scale, self._heights[:count])
+        half = heights // 2
+
+        top = self.center - half
+        if style == "Stereo" and lower is not None:
+            lower_window = lower[start:start + count]
+            lower_heights = self.scale_heights(lower_window, amplitude_scale, self._lower_heights[:len(lower_window)])
+            bottom = np.full(count, self.center, dtype=np.int64)
+            bottom[:len(lower_window)] += lower_heights // 2
+        elif style in ("Line", "Stereo", "Spectrum"):
+            bottom = self.center + half
+        elif style == "Bar":
+            bottom = top + heights - 1
+        else:
+            bottom = np.full(count, self.center, dtype=np.int64)
+
+        # Spread per-sample extents onto the columns each sample covers
+        active = (owners >= 0) & (owners < count)
+        self._top[active] = top[owners[active]]
+        self._bottom[active] = bottom[owners[active]]
+
+        if rainbow:
+            self._colors[active] = self.palette[(current_sample + owners[active]) % len(self.palette)]
+        else:
+            self._colors[:] = color
+
+    def layout_changed(self):
+        # False when the new layout would draw exactly the pixels already in the frame,
+        # e.g. during silence or while the visible envelope window does not move
+        return not (
+            np.array_equal(self._top, self._drawn_top)
+            and np.array_equal(self._bottom, self._drawn_bottom)
+            and np.array_equal(self._colors, self._drawn_colors)
+        )
+
+    def layout_rows(self):
+        # (first, stop) rows the current layout draws into
+        drawn = self._bottom >= self._top
+        if not drawn.any():
+            return (0, 0)
+        return (max(0, int(self._top[drawn].min())), min(self.height, int(self._bottom[drawn].max()) + 1))
+
+    def draw(self, first=0, stop=None):
+        # Clears rows first..stop-1 and draws the current layout into them; rows outside
+        # the range keep what the previous frame left there
+        stop = self.height if stop is None else stop
+        if stop > first:
+            rows = stop - first
+            frame = self.frame[first:stop]
+            mask = self._mask[:rows]
+            mask_tmp = self._mask_tmp[:rows]
+            frame.fill(0)
+            np.greater_equal(self._rows[first:stop], self._top, out=mask)
+            np.less_equal(self._rows[first:stop], self._bottom, out=mask_tmp)
+            np.logical_and(mask, mask_tmp, out=mask)
+            np.copyto(frame, self._colors[None, :, :], where=mask[:, :, None])
+
+        self._drawn_top[:] = self._top
+        self._drawn_bottom[:] = self._bottom
+        self._drawn_colors[:] = self._colors
+        self.drawn_rows = self.layout_rows()
+
+
+
+ENVELOPE_BASE_BIN = 64  # Samples per bin at the finest envelope level
+ENVELOPE_LEVELS = 10  # Each level halves the previous one, up to 64 * 2**9 samples per bin
+ENVELOPE_MIN, ENVELOPE_MAX, ENVELOPE_RMS = 0, 1, 2
+WINDOW_BINS_PER_BAR = 4  # Envelope bins reduced into each bar of the visible window
+
+WAVEFORM_WINDOWS = [0.25, 0.5, 1.0, 2.0, 5.0, 10.0]  # Seconds of audio shown across the canvas
+
+
+class AmplitudeEnvelope:
+    # Multi-resolution min/max/RMS envelope of an audio file. All levels live in one
+    # (bins, 3) float32 array, finest first, so it can be memory-mapped from a sidecar
+    # file instead of keeping the decoded signal in memory.
+    # data is the envelope of the mono mix. Stereo files also carry channel_data, the same
+    # pyramid per channel as a (2, bins, 3) array, and spectra maps (fps, bands) to a
+    # (frames, bands) uint8 table of band levels (see SpectrumBuilder).
+    def __init__(self, data, sample_rate, samples_len, level_offsets, level_lengths, base_bin=ENVELOPE_BASE_BIN, path=None, channel_data=None, spectra=None):
+        self.data = data
+        self.sample_rate = sample_rate
+        self.samples_len = samples_len
+        self.level_offsets = level_offsets
+        self.level_lengths = level_lengths
+        self.base_bin = base_bin
+        self.path = path
+        self.channel_data = channel_data
+        self.spectra = dict(spectra or {})
+
+    @property
+    def duration(self):
+        return self.samples_len / self.sample_rate
+
+    @classmethod
+    def from_blocks(cls, blocks, sample_rate, base_bin=ENVELOPE_BASE_BIN, levels=ENVELOPE_LEVELS):
+        builder = EnvelopeBuilder(sample_rate, base_bin, levels)
+        for block in blocks:
+            builder.update(block)
+        return builder.finish()
+
+    @staticmethod
+    def reduce_samples(frames):
+        reduced = np.empty((len(frames), 3), dtype=np.float32)
+        reduced[:, ENVELOPE_MIN] = frames.min(axis=1)
+        reduced[:, ENVELOPE_MAX] = frames.max(axis=1)
+        reduced[:, ENVELOPE_RMS] = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+        return reduced
+
+    @staticmethod
+    def downsample(level):
+        pairs = len(level) // 2
+        head = level[:pairs * 2].reshape(pairs, 2, 3)
+        reduced = np.empty((pairs + len(level) % 2, 3), dtype=np.float32)
+        reduced[:pairs, ENVELOPE_MIN] = head[:, :, ENVELOPE_MIN].min(axis=1)
+        reduced[:pairs, ENVELOPE_MAX] = head[:, :, ENVELOPE_MAX].max(axis=1)
+        reduced[:pairs, ENVELOPE_RMS] = np.sqrt(np.mean(np.square(head[:, :, ENVELOPE_RMS], dtype=np.float64), axis=1))
+        if len(level) % 2:
+            reduced[-1] = level[-1]
+        return reduced
+
+    @property
+    def channels(self):
+        return 1 if self.channel_data is None else len(self.channel_data)
+
+    def header(self):
+        return {
+            'sample_rate': self.sample_rate,
+            'samples_len': self.samples_len,
+            'base_bin': self.base_bin,
+            'level_offsets': self.level_offsets,
+            'level_lengths': self.level_lengths,
+            'channels': self.channels,
+            'spectra': sorted([fps, bands] for fps, bands in self.spectra),
+        }
+
+    @staticmethod
+    def sidecar_paths(path, header):
+        # Per-channel pyramids and spectrum tables sit next to the envelope as
+        # "<key>.channels.npy" and "<key>.spectrum-<fps>-<bands>.npy"
+        stem = os.path.splitext(path)[0]
+        paths = {}
+        if header['channels'] > 1:
+            paths['channels'] = stem + ".channels.npy"
+        for fps, bands in header['spectra']:
+            paths[(fps, bands)] = f"{stem}.spectrum-{fps}-{bands}.npy"
+        return paths
+
+    def save(self, path, temp_path):
+        # Arrays already saved at path (a cached envelope that gained a spectrum table) are
+        # not rewritten. The header goes last, so it never names a file that is not there yet.
+        header = self.header()
+        arrays = dict(self.spectra)
+        arrays['channels'] = self.channel_data
+        written = [] if self.path == path else [(path, self.data)]
+        for key, sidecar_path in self.sidecar_paths(path, header).items():
+            if self.path != path or not os.path.exists(sidecar_path):
+                written.append((sidecar_path, arrays[key]))
+        for array_path, values in written:
+            with open(temp_path, "wb") as f:
+                np.save(f, np.ascontiguousarray(values))
+            os.replace(temp_path, array_path)
+        with open(temp_path, "w") as f:
+            json.dump(header, f)
+        os.replace(temp_path, os.path.splitext(path)[0] + ".json")
+
+    @classmethod
+    def load(cls, path):
+        header_path = os.path.splitext(path)[0] + ".json"
+        try:
+            with open(header_path) as f:
+                header = json.load(f)
+            data = np.load(path, mmap_mode="r")
+            sidecars = {key: np.load(sidecar_path, mmap_mode="r") for key, sidecar_path in cls.sidecar_paths(path, header).items()}
+        except (OSError, ValueError, KeyError):
+            return None
+        if data.shape != (sum(header['level_lengths']), 3):
+            return None
+        channel_data = sidecars.pop('channels', None)
+        if channel_data is not None and channel_data.shape != (header['channels'],) + data.shape:
+            return None
+        if any(table.ndim != 2 or table.shape[1] != bands for (fps, bands), table in sidecars.items()):
+            return None
+        return cls(data, header['sample_rate'], header['samples_len'], header['level_offsets'], header['level_lengths'], header['base_bin'], path, channel_data, sidecars)
+
+    def __reduce__(self):
+        # File-backed envelopes travel to worker processes as a path, not as data
+        if self.path is not None:
+            return (AmplitudeEnvelope.load, (self.path,))
+        channel_data = None if self.channel_data is None else np.asarray(self.channel_data)
+        spectra = {key: np.asarray(table) for key, table in self.spectra.items()}
+        return (AmplitudeEnvelope, (np.asarray(self.data), self.sample_rate, self.samples_len, self.level_offsets, self.level_lengths, self.base_bin, None, channel_data, spectra))
+
+    def channel(self, index):
+        # Envelope of one channel (0 = left, 1 = right); a mono file is both of its channels
+        if self.channel_data is None:
+            return self
+        return AmplitudeEnvelope(self.channel_data[index], self.sample_rate, self.samples_len, self.level_offsets, self.level_lengths, self.base_bin)
+
+    def spectrum(self, fps, bands):
+        # (frames, bands) band levels for that frame rate and bar count, if computed
+        return self.spectra.get((fps, bands))
+
+    def bin_size(self, level):
+        return self.base_bin << level
+
+    def level_for_window(self, window_seconds, bars=WAVEFORM_SAMPLES):
+        # Coarsest level with WINDOW_BINS_PER_BAR bins per bar, so bar edges land within a
+        # fraction of a bar of their exact position
+        samples_per_bar = window_seconds * self.sample_rate / bars
+        level = 0
+        while level + 1 < len(self.level_lengths) and self.bin_size(level + 1) * WINDOW_BINS_PER_BAR <= samples_per_bar:
+            level += 1
+        return level
+
+    def bar_peaks(self, level, t, window_seconds, bars):
+        # Peak absolute amplitude of each of bars equal slices of the window_seconds that
+        # start at t, reduced from this level's bins; slices past the end of the audio are
+        # left out. Also returns the index of the first slice on a grid fixed to the audio,
+        # so colors can move with the waveform.
+        samples_per_bar = window_seconds * self.sample_rate / bars
+        start = t * self.sample_rate
+        length = self.level_lengths[level]
+        edges = ((start + np.arange(bars + 1) * samples_per_bar) // self.bin_size(level)).astype(np.int64)
+        count = int(np.searchsorted(edges[:-1], length))
+        first_bar = int(start // samples_per_bar)
+        if count == 0:
+            return np.zeros(0, dtype=np.float32), first_bar
+
+        # Bars narrower than a bin (tiny windows at level 0) repeat their bin; the last one
+        # always keeps at least one
+        edges = edges[:count + 1]
+        edges[-1] = min(max(edges[-1], edges[-2] + 1), length)
+        offset = self.level_offsets[level]
+        window = self.data[offset + edges[0]:offset + edges[-1]]
+        peaks = np.maximum(-window[:, ENVELOPE_MIN], window[:, ENVELOPE_MAX])
+        return np.maximum.reduceat(peaks, edges[:-1] - edges[0]), first_bar
+
+
+class EnvelopeBuilder:
+    # Incremental AmplitudeEnvelope construction; only finished bins and a carry of
+    # fewer than base_bin samples are kept between blocks
+    def __init__(self, sample_rate, base_bin=ENVELOPE_BASE_BIN, levels=ENVELOPE_LEVELS):
+        self.sample_rate = sample_rate
+        self.base_bin = base_bin
+        self.levels = levels
+        self.bins = []
+        self.carry = np.zeros(0, dtype=np.float32)
+        self.samples_len = 0
+
+    def update(self, block):
+        self.samples_len += len(block)
+        block = np.concatenate([self.carry, np.asarray(block, dtype=np.float32)])
+        full = len(block) // self.base_bin
+        if full:
+            self.bins.append(AmplitudeEnvelope.reduce_samples(block[:full * self.base_bin].reshape(full, self.base_bin)))
+        self.carry = block[full * self.base_bin:]
+
+    def finish(self):
+        if len(self.carry):
+            self.bins.append(AmplitudeEnvelope.reduce_samples(self.carry.reshape(1, -1)))
+            self.carry = self.carry[:0]
+
+        level = np.concatenate(self.bins) if self.bins else np.zeros((0, 3), dtype=np.float32)
+        pyramid = [level]
+        for _ in range(self.levels - 1):
+            level = AmplitudeEnvelope.downsample(level)
+            pyramid.append(level)
+
+        level_lengths = [len(level) for level in pyramid]
+        level_offsets = [int(offset) for offset in np.cumsum([0] + level_lengths[:-1])]
+        return AmplitudeEnvelope(np.concatenate(pyramid), self.sample_rate, self.samples_len, level_offsets, level_lengths, self.base_bin)
+
+
+SPECTRUM_FFT_SIZE = 4096  # 10.8 Hz bins at 44.1 kHz; windows overlap at any frame rate above 10.8 fps
+SPECTRUM_MIN_HZ = 40
+SPECTRUM_MAX_HZ = 16000
+SPECTRUM_FLOOR_DB = -60  # Band level drawn with zero height; a full-scale sine (0 dB) is full height
+
+
+class SpectrumBuilder:
+    # Incremental per-frame band levels for the Spectrum style: an STFT whose hop is the
+    # samples per video frame (frame f is the Hann window centered on f / fps), averaged
+    # into log-spaced bands and stored as a (frames, bands) uint8 table, so drawing a frame
+    # is one row lookup. Only the samples the next windows need are kept between blocks.
+    def __init__(self, sample_rate, fps, bands, fft_size=SPECTRUM_FFT_SIZE):
+        self.sample_rate = sample_rate
+        self.fps = fps
+        self.bands = bands
+        self.fft_size = fft_size
+        self.window = np.hanning(fft_size).astype(np.float32)
+        # Magnitude scale that reads a full-scale sine as 1 (the Hann window halves it)
+        self.norm = 4 / fft_size
+
+        # FFT bins [band_starts, band_stops) of each band. Low bands narrower than one bin
+        # are widened to one, pushing the following edges up.
+        num_bins = fft_size // 2 + 1
+        edges = np.geomspace(SPECTRUM_MIN_HZ, min(SPECTRUM_MAX_HZ, sample_rate / 2), bands + 1)
+        edge_bins = np.round(edges * fft_size / sample_rate).astype(np.int64)
+        for i in range(1, len(edge_bins)):
+            edge_bins[i] = max(edge_bins[i], edge_bins[i - 1] + 1)
+        self.band_starts = np.minimum(edge_bins[:-1], num_bins - 1)
+        self.band_stops = np.maximum(np.minimum(edge_bins[1:], num_bins), self.band_starts + 1)
+
+        half = fft_size // 2
+        self.buffer = np.zeros(half, dtype=np.float32)  # Silence before the first sample
+        self.buffer_start = -half  # Absolute sample index of buffer[0]
+        self.next_frame = 0
+        self.samples_len = 0
+        self.rows = []
+
+    def frame_center(self, frame):
+        return frame * self.sample_rate // self.fps
+
+    def update(self, block):
+        block = np.asarray(block, dtype=np.float32)
+        self.samples_len += len(block)
+        self.buffer = np.concatenate([self.buffer, block])
+        self.emit()
+
+    def emit(self):
+        # All frames whose window ends inside the buffer, in one batched FFT
+        half = self.fft_size // 2
+        last_center = self.buffer_start + len(self.buffer) - half
+        stop = ((last_center + 1) * self.fps - 1) // self.sample_rate + 1 if last_center >= 0 else 0
+        if stop > self.next_frame:
+            starts = self.frame_center(np.arange(self.next_frame, stop)) - half - self.buffer_start
+            windows = self.buffer[starts[:, None] + np.arange(self.fft_size)]
+            self.rows.append(self.band_levels(windows))
+            self.next_frame = stop
+        drop = self.frame_center(self.next_frame) - half - self.buffer_start
+        if drop > 0:
+            self.buffer = self.buffer[drop:]
+            self.buffer_start += drop
+
+    def band_levels(self, windows):
+        power = np.square(np.abs(np.fft.rfft(windows * self.window, axis=1)) * self.norm)
+        sums = np.zeros((len(power), power.shape[1] + 1))
+        np.cumsum(power, axis=1, out=sums[:, 1:])
+        band_power = (sums[:, self.band_stops] - sums[:, self.band_starts]) / (self.band_stops - self.band_starts)
+        db = 10 * np.log10(np.maximum(band_power, 1e-12))
+        return np.round(np.clip(1 - db / SPECTRUM_FLOOR_DB, 0, 1) * 255).astype(np.uint8)
+
+    def finish(self):
+        # Frames up to the end of the audio, the last windows padded with silence
+        frames = -(-self.samples_len * self.fps // self.sample_rate)
+        self.buffer = np.concatenate([self.buffer, np.zeros(self.fft_size, dtype=np.float32)])
+        self.emit()
+        table = np.concatenate(self.rows) if self.rows else np.zeros((0, self.bands), dtype=np.uint8)
+        return table[:frames]
+
+
+STEREO_MIX_GAIN = 0.5 ** 0.5  # ffmpeg's stereo to mono downmix (-ac 1) is (L + R) / sqrt(2)
+
+
+class FeatureBuilder:
+    # Everything the waveform styles draw, from one pass over the decoded blocks: the
+    # envelope of the mono mix, one envelope per channel of a stereo file and a spectrum
+    # table per requested (fps, bands). Stereo blocks are (samples, 2) arrays.
+    def __init__(self, sample_rate, channels=1, spectra=()):
+        self.channels = channels
+        self.mix = EnvelopeBuilder(sample_rate)
+        self.channel_builders = [EnvelopeBuilder(sample_rate) for _ in range(channels)] if channels > 1 else []
+        self.spectrum_builders = [SpectrumBuilder(sample_rate, fps, bands) for fps, bands in spectra]
+
+    def update(self, block):
+        if self.channels > 1:
+            # Mixed like ffmpeg downmixes, so the classic styles draw what they did before
+            for i, builder in enumerate(self.channel_builders):
+                builder.update(block[:, i])
+            block = (block[:, 0] + block[:, 1]) * np.float32(STEREO_MIX_GAIN)
+        self.mix.update(block)
+        for builder in self.spectrum_builders:
+            builder.update(block)
+
+    def finish(self):
+        mix = self.mix.finish()
+        channel_data = np.stack([builder.finish().data for builder in self.channel_builders]) if self.channel_builders else None
+        spectra = {(builder.fps, builder.bands): builder.finish() for builder in self.spectrum_builders}
+        return AmplitudeEnvelope(mix.data, mix.sample_rate, mix.samples_len, mix.level_offsets, mix.level_lengths, mix.base_bin, channel_data=channel_data, spectra=spectra)
+
+
+DECODE_SAMPLE_RATE = 44100  # Rate of the decoded stream the envelope is built from
+DECODE_BLOCK_SECONDS = 10
+
+
+def probe_channels(path):
+    # 1 for mono files, else 2: ffmpeg downmixes anything wider to stereo while decoding.
+    # Read from the stream summary ffmpeg prints for an input without an output.
+    probe = subprocess.run([get_ffmpeg_exe(), '-hide_banner', '-i', path], stdin=subprocess.DEVNULL, capture_output=True)
+    match = re.search(r"Audio: .*?\d+ Hz, ([^,\n]+)", probe.stderr.decode(errors="replace"))
+    if match is None or match.group(1).strip() in ("mono", "1 channels"):
+        return 1
+    return 2
+
+
+def stream_audio(path, sample_rate=DECODE_SAMPLE_RATE, block_seconds=DECODE_BLOCK_SECONDS, channels=1):
+    # Yields float32 blocks decoded and resampled by ffmpeg, so memory use is bounded
+    # by the block size rather than the length of the file. Blocks are mono arrays, or
+    # (samples, channels) arrays when more than one channel is asked for.
+    decode_cmd = [
+        get_ffmpeg_exe(),
+        '-v', 'error',
+        '-i', path,
+        '-f', 'f32le',
+        '-ac', str(channels),
+        '-ar', str(sample_rate),
+        '-'
+    ]
+    block_bytes = int(block_seconds * sample_rate) * 4 * channels
+    process = subprocess.Popen(decode_cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                break
+            block = np.frombuffer(data, dtype=np.float32)
+            yield block if channels == 1 else block.reshape(-1, channels)
+        errors = process.stderr.read().decode(errors="replace").strip()
+        if process.wait() != 0:
+            raise RuntimeError(f"ffmpeg could not decode {path}: {errors}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        process.stderr.close()
+
+class SubtitleIndex:
+    # Subtitles as columns sorted by start: start, end and running-max-end times in float
+    # arrays, and all texts in one UTF-8 buffer with an offset per subtitle, rather than a
+    # dict per subtitle. Lookups are O(log n) and match the old linear scan: the first
+    # segment (by start) with start <= t <= end. Pickles compactly for worker processes.
+    def __init__(self, segments=()):
+        self.clear()
+        self.extend(segments)
+
+    def clear(self):
+        self.starts = array('d')
+        self.ends = array('d')
+        # Running max of end times lets the backwards walk stop as soon as nothing earlier can match
+        self.max_ends = array('d')
+        self.text_offsets = array('q', [0])
+        self.text_data = bytearray()
+
+    def __len__(self):
+        return len(self.starts)
+
+    def text(self, i):
+        return self.text_data[self.text_offsets[i]:self.text_offsets[i + 1]].decode("utf-8")
+
+    def rows(self, first=0, stop=None):
+        stop = len(self) if stop is None else stop
+        return [(self.starts[i], self.ends[i], self.text(i)) for i in range(first, stop)]
+
+    def extend(self, segments):
+        rows = sorted(((s['start'], s['end'], s['text']) for s in segments), key=lambda row: row[0])
+        self.extend_rows(rows)
+
+    def extend_rows(self, rows):
+        # rows are (start, end, text) tuples sorted by start
+        if rows and len(self) and rows[0][0] < self.starts[-1]:
+            # Out-of-order additions: rebuild from scratch
+            rows = sorted(self.rows() + rows, key=lambda row: row[0])
+            self.clear()
+
+        max_end = self.max_ends[-1] if len(self) else float("-inf")
+        for start, end, text in rows:
+            self.starts.append(start)
+            self.ends.append(end)
+            max_end = max(max_end, end)
+            self.max_ends.append(max_end)
+            self.text_data += text.encode("utf-8")
+            self.text_offsets.append(len(self.text_data))
+
+    def between(self, start, end):
+        # New index with only the subtitles overlapping start..end
+        first = bisect.bisect_left(self.max_ends, start)
+        stop = bisect.bisect_right(self.starts, end)
+        index = SubtitleIndex()
+        index.extend_rows([row for row in self.rows(first, max(first, stop)) if row[1] >= start])
+        return index
+
+    def text_at(self, t):
+        match = None
+        i = bisect.bisect_right(self.starts, t) - 1
+        while i >= 0 and self.max_ends[i] >= t:
+            if self.ends[i] >= t:
+                match = i
+            i -= 1
+        return "" if match is None else self.text(match)
+
+
+class SegmentStore:
+    # Word-chunked subtitles for one job. A streaming transcription appends to it window by
+    # window; renderers that need the subtitles at time t wait until that part is covered.
+    # segments may be a list of subtitle dicts or a SubtitleIndex, which is used as is.
+    def __init__(self, segments=None, complete=True):
+        self.index = segments if isinstance(segments, SubtitleIndex) else SubtitleIndex()
+        self.covered_until = float("inf") if len(self.index) else 0.0
+        self.finished = False
+        self.error = None
+        self.condition = threading.Condition()
+        if segments and not isinstance(segments, SubtitleIndex):
+            self.extend(segments, float("inf"))
+        if complete:
+            self.finish()
+
+    def __len__(self):
+        return len(self.index)
+
+    def extend(self, segments, covered_until):
+        with self.condition:
+            self.index.extend(segments)
+            self.covered_until = max(self.covered_until, covered_until)
+            self.condition.notify_all()
+
+    def finish(self, error=None):
+        with self.condition:
+            self.finished = True
+            self.error = error
+            if error is None:
+                self.covered_until = float("inf")
+            self.condition.notify_all()
+
+    def wait_until(self, t):
+        # Blocks until subtitles past t are known; re-raises a failed transcription
+        with self.condition:
+            while self.covered_until <= t and not self.finished:
+                self.condition.wait()
+            if self.error is not None:
+                raise self.error
+
+    def text_at(self, t):
+        if self.finished:
+            # Nothing is added once finished, so concurrent readers need no lock
+            return self.index.text_at(t)
+        with self.condition:
+            return self.index.text_at(t)
+
+    def segments_between(self, start, end):
+        with self.condition:
+            return self.index.between(start, end)
+
+
+class SubtitleGlyphCache:
+    # Rendered subtitle surfaces keyed by (text, font, color); a subtitle stays on screen
+    # for many frames, so each one is rasterized once instead of once per frame
+    def __init__(self, font_size=18, max_entries=256):
+        self.font_size = font_size
+        self.max_entries = max_entries
+        self.fonts = {}
+        self.surfaces = OrderedDict()
+
+    def render(self, text, font_name, color):
+        key = (text, font_name, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+
+        font = self.fonts.get(font_name)
+        if font is None:
+            font = self.fonts[font_name] = pygame.font.SysFont(font_name, self.font_size)
+        surface = font.render(text, True, pygame.Color(color))
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
+
+
+def layout_waveform(rasterizer, envelope, level, t, settings):
+    # Lays out the frame at time t from precomputed features only: the window_seconds from
+    # t reduced to one peak per bar (per channel for Stereo) or one row of the spectrum table
+    if settings.style == "Spectrum":
+        table = envelope.spectrum(settings.fps, rasterizer.num_samples)
+        frame = -1 if table is None else min(round(t * settings.fps), len(table) - 1)
+        bands = table[frame] if frame >= 0 else np.zeros(0, dtype=np.uint8)
+        rasterizer.layout(bands, 0, settings.amplitude_scale / 255, settings.style, settings.waveform_color, settings.rainbow)
+        return
+
+    lower = None
+    if settings.style == "Stereo":
+        peaks, first_bar = envelope.channel(0).bar_peaks(level, t, settings.window_seconds, rasterizer.num_samples)
+        lower, _ = envelope.channel(1).bar_peaks(level, t, settings.window_seconds, rasterizer.num_samples)
+    else:
+        peaks, first_bar = envelope.bar_peaks(level, t, settings.window_seconds, rasterizer.num_samples)
+    rasterizer.layout(peaks, first_bar, settings.amplitude_scale, settings.style, settings.waveform_color, settings.rainbow, first_bar, lower)
+
+
+def draw_waveform(rasterizer, envelope, level, t, settings):
+    layout_waveform(rasterizer, envelope, level, t, settings)
+    rasterizer.draw()
+    return rasterizer.frame
+
+
+class FrameTimer:
+    # Rolling window of frame durations for fps and p95 readouts
+    def __init__(self, size=120):
+        self.durations = deque(maxlen=size)
+        self.stamps = deque(maxlen=size)
+
+    def add(self, duration):
+        self.durations.append(duration)
+        self.stamps.append(time.perf_counter())
+
+    def fps(self):
+        stamps = list(self.stamps)
+        if len(stamps) < 2 or stamps[-1] == stamps[0]:
+            return 0.0
+        return (len(stamps) - 1) / (stamps[-1] - stamps[0])
+
+    def p95(self):
+        durations = list(self.durations)
+        return float(np.percentile(durations, 95)) if durations else 0.0
+
+
+class PlaybackClock:
+    # Position of the playing audio in seconds. pygame's get_pos() only counts time since the
+    # last play(), so it restarts at zero after a seek; this clock keeps the seek offset and
+    # the paused position itself and advances on the monotonic perf_counter in between.
+    # Read from the Tk thread and the preview renderer thread.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.offset = 0.0  # Position when the clock was last started or paused
+        self.started = None  # perf_counter() at that moment while running, None while paused
+
+    def start(self, position=0.0):
+        with self.lock:
+            self.offset = position
+            self.started = time.perf_counter()
+
+    def pause(self):
+        with self.lock:
+            if self.started is not None:
+                self.offset += time.perf_counter() - self.started
+                self.started = None
+
+    def resume(self):
+        with self.lock:
+            if self.started is None:
+                self.started = time.perf_counter()
+
+    def __call__(self):
+        with self.lock:
+            if self.started is None:
+                return self.offset
+            return self.offset + time.perf_counter() - self.started
+
+
+PREVIEW_FPS = 30
+PREVIEW_TICK_MS = 1000 // PREVIEW_FPS  # One Tk timer presents frames, subtitles and the slider, once per frame
+
+
+class PreviewRenderer:
+    # Renders preview frames on a worker thread into three preallocated buffers (one being
+    # drawn, one ready, one on screen). The Tk thread only takes the newest finished frame;
+    # a ready frame that was never taken is overwritten and counted as dropped.
+    def __init__(self, envelope, clock, fps=PREVIEW_FPS, buffers=3):
+        self.envelope = envelope
+        self.clock = clock
+        self.interval = 1.0 / fps
+        self.rasterizers = [WaveformRasterizer() for _ in range(buffers)]
+        # PIL images sharing memory with each frame buffer, ready for PhotoImage.paste
+        self.images = [
+            Image.frombuffer("RGBX", (r.width, r.height), r.buffer, "raw", "RGBX", 0, 1)
+            for r in self.rasterizers
+        ]
+        self.settings = None
+        self.lock = threading.Lock()
+        self.ready = None
+        self.shown = None
+        self.dropped = 0
+        self.render_timer = FrameTimer()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def update_settings(self, settings):
+        # Called from the Tk thread; Tk variables are never read from the worker
+        self.settings = settings
+
+    def run(self):
+        next_tick = time.perf_counter()
+        while not self.stopped.is_set():
+            settings = self.settings
+            if settings is not None:
+                started = time.perf_counter()
+                with self.lock:
+                    index = next(i for i in range(len(self.rasterizers)) if i != self.ready and i != self.shown)
+
+                rasterizer = self.rasterizers[index]
+                level = self.envelope.level_for_window(settings.window_seconds, rasterizer.num_samples)
+                draw_waveform(rasterizer, self.envelope, level, self.clock(), settings)
+                self.render_timer.add(time.perf_counter() - started)
+
+                with self.lock:
+                    if self.ready is not None:
+                        self.dropped += 1
+                    self.ready = index
+
+            next_tick += self.interval
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                self.stopped.wait(delay)
+            else:
+                next_tick = time.perf_counter()
+
+    def take(self):
+        # Newest finished frame as a PIL image, or None if nothing new was rendered
+        with self.lock:
+            if self.ready is None:
+                return None
+            self.shown, self.ready = self.ready, None
+            return self.images[self.shown]
+
+
+def subtitle_font_size(height):
+    return max(8, round(SUBTITLE_FONT_SIZE * height / CANVAS_HEIGHT))
+
+
+def merge_rows(a, b):
+    # Smallest (first, stop) row range covering both; empty ranges are ignored
+    if a[1] <= a[0]:
+        return b
+    if b[1] <= b[0]:
+        return a
+    return (min(a[0], b[0]), max(a[1], b[1]))
+
+
+def rows_overlap(a, b):
+    return max(a[0], b[0]) < min(a[1], b[1])
+
+
+def render_frames(envelope, fps, start_frame, end_frame, settings, segments, rgbx=False):
+    # Yields frames start_frame..end_frame-1; the buffer is reused, so consume each frame before the next.
+    # segments is a list, a SubtitleIndex or a SegmentStore that may still be filled by a
+    # streaming transcription; None draws no subtitles.
+    # With rgbx the 4-channel buffer itself is yielded: ffmpeg reads it as rgba and ignores the
+    # padding byte, which saves repacking every frame to 3 channels before it is piped.
+    pygame.font.init()
+    store = segments if isinstance(segments, SegmentStore) else SegmentStore(segments)
+    # Frame geometry comes from the render profile (see export_video_file)
+    width, height = settings.width, settings.height
+    rasterizer = WaveformRasterizer(width, height, settings.bars)
+    glyphs = SubtitleGlyphCache(font_size=subtitle_font_size(height))
+    subtitle_center = (width // 2, round(height * SUBTITLE_CENTER_Y))
+    level = envelope.level_for_window(settings.window_seconds, rasterizer.num_samples)
+
+    # The buffer keeps the previous frame, so only rows whose content changes are redrawn:
+    # the waveform band when its layout moved and the subtitle band when the text changed
+    # or the waveform reaches into it. Silent stretches and static subtitles cost almost
+    # nothing, and every frame is still identical to a full redraw.
+    shown_subtitle = None
+    subtitle_rows = (0, 0)
+    for frame_num in range(start_frame, end_frame):
+        t = frame_num / fps
+
+        layout_waveform(rasterizer, envelope, level, t, settings)
+
+        # Subtitle, waiting for the transcription to reach t if it is still streaming
+        if t >= store.covered_until:
+            store.wait_until(t)
+        subtitle = store.text_at(t)
+        text_surface = None
+        new_subtitle_rows = (0, 0)
+        if subtitle:
+            text_surface = glyphs.render(subtitle, settings.font, settings.subtitle_color)
+            text_rect = text_surface.get_rect(center=subtitle_center)
+            new_subtitle_rows = (max(0, text_rect.top), min(rasterizer.height, text_rect.bottom))
+
+        spans = []
+        if rasterizer.layout_changed():
+            spans.append(merge_rows(rasterizer.drawn_rows, rasterizer.layout_rows()))
+        subtitle_span = merge_rows(subtitle_rows, new_subtitle_rows)
+        redraw_subtitle = subtitle != shown_subtitle or any(rows_overlap(span, subtitle_span) for span in spans)
+        if redraw_subtitle:
+            spans.append(subtitle_span)
+
+        if len(spans) == 2 and rows_overlap(*spans):
+            spans = [merge_rows(*spans)]
+        for first, stop in spans:
+            rasterizer.draw(first, stop)
+        if redraw_subtitle and text_surface is not None:
+            rasterizer.surface.blit(text_surface, text_rect)
+
+        shown_subtitle = subtitle
+        subtitle_rows = new_subtitle_rows
+        yield rasterizer.buffer if rgbx else rasterizer.frame
+
+
+def export_segment(segment_path, start_frame, end_frame, envelope, fps, codec_params, settings, segments):
+    # Worker entry point: renders one time range into its own libx264 file. The file only
+    # appears under its final name once complete, so a crash never leaves a truncated segment.
+    partial_path = os.path.splitext(segment_path)[0] + PARTIAL_SEGMENT_SUFFIX
+    writer = imageio.get_writer(
+        partial_path, fps=fps, codec='libx264', quality=None, macro_block_size=2,
+        ffmpeg_log_level='error', output_params=list(codec_params)
+    )
+    for frame_image in render_frames(envelope, fps, start_frame, end_frame, settings, segments, rgbx=True):
+        writer.append_data(frame_image)
+    writer.close()
+    os.replace(partial_path, segment_path)
+    return end_frame - start_frame
+
+
+def mux_subtitles(video_path, subtitle_path, codec, output_path):
+    # Adds a subtitle stream to a finished video; video and audio are copied, not re-encoded
+    subprocess.run([
+        get_ffmpeg_exe(), '-y', '-loglevel', 'error',
+        '-i', video_path, '-i', subtitle_path,
+        '-map', '0', '-map', '1:s:0', '-c', 'copy', '-c:s', codec, output_path
+    ], check=True)
+
+
+def render_video_parallel(output_path, audio_path, envelope, fps, total_frames, codec_params, settings, segments, workers, chunk_seconds, progress=None, audio_params=None, subtitle_track=None, checkpoint=None):
+    # Splits the timeline into chunks, encodes them in a process pool, then joins them with the
+    # concat demuxer and muxes the audio in the same ffmpeg run. subtitle_track, if given, is
+    # called once the chunks are done and returns (path, codec) of a subtitle stream to add.
+    # With an ExportCheckpoint the chunks are kept in its directory, chunks a previous run
+    # finished are reused, and the directory is only removed once the output is complete.
+    chunk_frames = max(1, int(chunk_seconds * fps))
+    store = segments if isinstance(segments, SegmentStore) else SegmentStore(segments)
+    segment_dir = checkpoint.directory if checkpoint else tempfile.mkdtemp(prefix="whispervisualizer_")
+    try:
+        futures = {}
+        segment_paths = []
+        # Spawned rather than forked: the GUI and job server export from a process that
+        # runs threads, and a forked child can inherit a lock one of them was holding
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            try:
+                for index, start_frame in enumerate(range(0, total_frames, chunk_frames)):
+                    end_frame = min(start_frame + chunk_frames, total_frames)
+                    segment_path = os.path.join(segment_dir, f"segment_{index:05d}.mp4")
+                    segment_paths.append(segment_path)
+
+                    # Only ship the subtitles this range touches, once transcription has reached it;
+                    # a cached envelope is sent as its path
+                    start_time = start_frame / fps
+                    end_time = (end_frame - 1) / fps
+                    store.wait_until(end_time)
+                    range_segments = store.segments_between(start_time, end_time)
+
+                    # A finished chunk is reused if it was rendered with the same subtitles
+                    chunk = None
+                    if checkpoint:
+                        chunk = (index, start_frame, end_frame, checkpoint.subtitles_hash(range_segments))
+                        if checkpoint.is_done(*chunk):
+                            if progress:
+                                progress(end_frame - start_frame)
+                            continue
+
+                    futures[executor.submit(
+                        export_segment, segment_path, start_frame, end_frame,
+                        envelope, fps, codec_params, settings, range_segments
+                    )] = chunk
+
+                for future in as_completed(futures):
+                    frames_done = future.result()
+                    if checkpoint:
+                        checkpoint.mark_done(*futures[future])
+                    if progress:
+                        progress(frames_done)
+            except BaseException:
+                # Report a failed chunk right away instead of rendering the rest of the queue first
+                executor.shutdown(cancel_futures=True)
+                raise
+
+        concat_list = os.path.join(segment_dir, "segments.txt")
+        with open(concat_list, "w") as f:
+            for segment_path in segment_paths:
+                # Quoted for the concat demuxer: a ' inside the path is written as '\''
+                quoted = segment_path.replace("'", "'\\''")
+                f.write(f"file '{quoted}'\n")
+
+        concat_cmd = [
+            get_ffmpeg_exe(),
+            '-y',
+            '-loglevel', 'error',
+            '-f', 'concat',
+            '-safe', '0',
+            '-i', concat_list,
+            '-i', audio_path,
+            '-map', '0:v:0',
+            '-map', '1:a:0',
+            '-c:v', 'copy'
+        ] + list(audio_params or AUDIO_OUTPUT_PARAMS)
+        if subtitle_track:
+            subtitle_path, codec = subtitle_track()
+            concat_cmd[concat_cmd.index('-map'):concat_cmd.index('-map')] = ['-i', subtitle_path]
+            concat_cmd += ['-map', '2:s:0', '-c:s', codec]
+        subprocess.run(concat_cmd + [output_path], check=True)
+        if checkpoint:
+            checkpoint.remove()
+    finally:
+        if not checkpoint:
+            shutil.rmtree(segment_dir, ignore_errors=True)
+
+
+AUDIO_OUTPUT_PARAMS = ['-c:a', 'aac', '-b:a', '192k', '-ac', '1', '-ar', '44100']
+DRAFT_AUDIO_PARAMS = ['-c:a', 'libmp3lame', '-b:a', '96k', '-ac', '1', '-ar', '22050']  # About 5x faster to encode than AAC
+
+QUALITY_LEVELS = {"High": 18, "Medium": 23, "Low": 28}  # x264 CRF; overrides the profile's CRF when given
+
+# Named render tiers. Each fixes the frame size, frame rate, bar count, default zoom
+# window, the x264 preset/CRF/threads (threads 0 lets x264 decide) and the audio codec.
+RENDER_PROFILES = {
+    "draft": {'width': 480, 'height': 224, 'fps': 15, 'bars': 120, 'window_seconds': 1.0, 'preset': "ultrafast", 'crf': 30, 'threads': 0, 'audio': DRAFT_AUDIO_PARAMS},
+    "standard": {'width': 900, 'height': 400, 'fps': 30, 'bars': 200, 'window_seconds': 1.0, 'preset': "medium", 'crf': 18, 'threads': 0, 'audio': AUDIO_OUTPUT_PARAMS},
+    "hd": {'width': 1280, 'height': 720, 'fps': 30, 'bars': 240, 'window_seconds': 1.0, 'preset': "fast", 'crf': 20, 'threads': 0, 'audio': AUDIO_OUTPUT_PARAMS},
+    "final": {'width': 1920, 'height': 1080, 'fps': 30, 'bars': 320, 'window_seconds': 1.0, 'preset': "slow", 'crf': 18, 'threads': 0, 'audio': AUDIO_OUTPUT_PARAMS},
+}
+DEFAULT_PROFILE = "standard"
+MAX_RESOLUTION = (1920, 1080)
+X264_MAX_CRF = 51
+X264_PRESETS = ["ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow", "slower", "veryslow"]
+
+
+def build_profile(name=DEFAULT_PROFILE, **overrides):
+    # Copy of a named profile with the given non-None values replaced
+    if name not in RENDER_PROFILES:
+        raise ValueError(f"Unknown render profile: {name}")
+    profile = dict(RENDER_PROFILES[name])
+    profile.update({key: value for key, value in overrides.items() if value is not None})
+
+    width, height = profile['width'], profile['height']
+    if width > MAX_RESOLUTION[0] or height > MAX_RESOLUTION[1]:
+        raise ValueError(f"Resolution {width}x{height} is above the {MAX_RESOLUTION[0]}x{MAX_RESOLUTION[1]} maximum")
+    if width < 16 or height < 16 or width % 2 or height % 2:
+        raise ValueError(f"Resolution {width}x{height} must be even and at least 16x16")
+    if profile['preset'] not in X264_PRESETS:
+        raise ValueError(f"Unknown x264 preset: {profile['preset']}")
+    if profile['fps'] <= 0 or profile['bars'] <= 0:
+        raise ValueError("fps and bars must be positive")
+    if not 0 <= profile['crf'] <= X264_MAX_CRF:
+        raise ValueError(f"CRF must be between 0 and {X264_MAX_CRF}, not {profile['crf']}")
+    return profile
+
+
+def encoder_params(profile, quality=None):
+    # libx264 output options for a profile; quality names map to a CRF that overrides the profile's
+    crf = QUALITY_LEVELS[quality] if quality else profile['crf']
+    params = ['-preset', profile['preset'], '-crf', str(crf)]
+    if profile['threads']:
+        params += ['-threads', str(profile['threads'])]
+    return params
+
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a", ".flac", ".ogg", ".aac")
+
+TRANSCRIBE_OPTIONS = {'word_timestamps': True}
+WHISPER_SAMPLE_RATE = 16000  # Whisper models expect mono 16 kHz audio
+WHISPER_MODEL_SIZES = ["tiny", "base", "small", "medium", "large-v3"]
+
+
+class WhisperEngine:
+    # openai-whisper on torch, the original engine. Engines take a file path or a mono
+    # float32 16 kHz array and return the compact word-level result chunk_segments reads;
+    # the model itself is loaded on first use.
+    name = "whisper"
+
+    def __init__(self, model_name="base", threads=0):
+        self.model_name = model_name
+        self.threads = threads
+        self.model = None
+        self.lock = threading.Lock()
+        # One transcription at a time per engine: openai-whisper installs its decoder cache
+        # as forward hooks on the shared model for each call, so concurrent calls from job
+        # workers would read each other's cached tensors
+        self.transcribe_lock = threading.Lock()
+
+    @property
+    def cache_id(self):
+        return self.model_name
+
+    def load(self):
+        with self.lock:
+            if self.model is None:
+                import whisper
+                if self.threads:
+                    import torch
+                    torch.set_num_threads(self.threads)
+                self.model = whisper.load_model(self.model_name)
+        return self.model
+
+    def transcribe(self, audio):
+        model = self.load()
+        with self.transcribe_lock:
+            return compact_transcript(model.transcribe(audio, **TRANSCRIBE_OPTIONS))
+
+
+class FasterWhisperEngine(WhisperEngine):
+    # CTranslate2 port of Whisper (faster-whisper) with int8 weights by default; several
+    # times faster than torch on CPU. batch_size > 1 runs the batched pipeline, which
+    # splits the audio on voice activity and decodes the pieces together.
+    name = "faster-whisper"
+
+    def __init__(self, model_name="base", threads=0, compute_type="int8", batch_size=1):
+        super().__init__(model_name, threads)
+        self.compute_type = compute_type
+        self.batch_size = batch_size
+        self.pipeline = None
+
+    @property
+    def cache_id(self):
+        cache_id = f"{self.name}:{self.model_name}:{self.compute_type}"
+        if self.batch_size > 1:
+            cache_id += ":batched"
+        return cache_id
+
+    def load(self):
+        with self.lock:
+            if self.model is None:
+                try:
+                    import faster_whisper
+                except ImportError:
+                    raise RuntimeError("The faster-whisper engine needs the faster-whisper package (pip install faster-whisper)")
+                self.model = faster_whisper.WhisperModel(self.model_name, device="cpu", compute_type=self.compute_type, cpu_threads=self.threads)
+                if self.batch_size > 1:
+                    self.pipeline = faster_whisper.BatchedInferencePipeline(model=self.model)
+        return self.pipeline or self.model
+
+    def transcribe(self, audio):
+        model = self.load()
+        options = {'batch_size': self.batch_size} if self.batch_size > 1 else {}
+        # Serialized like the torch engine; segments decode lazily, so the lock covers the loop
+        with self.transcribe_lock:
+            segments, info = model.transcribe(audio, **TRANSCRIBE_OPTIONS, **options)
+            segments = [
+                {
+                    'start': segment.start,
+                    'end': segment.end,
+                    'text': segment.text,
+                    'words': [{'word': w.word, 'start': w.start, 'end': w.end} for w in segment.words or []]
+                }
+                for segment in segments
+            ]
+        return compact_transcript({'language': info.language, 'segments': segments})
+
+
+class FakeEngine(WhisperEngine):
+    # Offline stand-in for tests and benchmarks: one word every 0.3 s of audio
+    name = "fake"
+    word_seconds = 0.3
+    words_per_segment = 12
+
+    @property
+    def cache_id(self):
+        return f"{self.name}:{self.model_name}"
+
+    def transcribe(self, audio):
+        if isinstance(audio, str):
+            samples = sum(len(block) for block in stream_audio(audio, WHISPER_SAMPLE_RATE))
+        else:
+            samples = len(audio)
+        duration = samples / WHISPER_SAMPLE_RATE
+
+        words = []
+        for i in range(int(duration / self.word_seconds)):
+            start = i * self.word_seconds
+            words.append({'word': f" word{i}", 'start': start, 'end': start + self.word_seconds * 0.8})
+
+        segments = []
+        for i in range(0, len(words), self.words_per_segment):
+            segment_words = words[i:i + self.words_per_segment]
+            segments.append({
+                'start': segment_words[0]['start'],
+                'end': segment_words[-1]['end'],
+                'text': ''.join(w['word'] for w in segment_words),
+                'words': segment_words
+            })
+        return compact_transcript({'text': ''.join(s['text'] for s in segments), 'language': 'en', 'segments': segments})
+
+
+TRANSCRIPTION_ENGINES = {engine.name: engine for engine in (WhisperEngine, FasterWhisperEngine, FakeEngine)}
+
+transcribers = {}  # Engines by configuration, shared by every job in this process
+transcribers_lock = threading.Lock()
+
+
+def load_transcriber(engine="whisper", model_name="base", threads=0, **options):
+    # Returns the shared engine for this configuration; its model loads on first transcription
+    key = (engine, model_name, threads, tuple(sorted(options.items())))
+    with transcribers_lock:
+        if key not in transcribers:
+            transcribers[key] = TRANSCRIPTION_ENGINES[engine](model_name, threads, **options)
+        return transcribers[key]
+
+CACHE_DIR = os.environ.get(
+    "WHISPERVISUALIZER_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "whispervisualizer")
+)
+TRANSCRIPT_CACHE_DIR = os.path.join(CACHE_DIR, "transcripts")
+TRANSCRIPT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+ENVELOPE_CACHE_DIR = os.path.join(CACHE_DIR, "envelopes")
+ENVELOPE_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+EXPORTS_DIR = os.path.join(CACHE_DIR, "exports")
+EXPORT_CHECKPOINT_MAX_AGE = 7 * 24 * 3600  # Unfinished exports untouched this long are dropped
+TEMP_DIR_MAX_AGE = 24 * 3600  # Temp directories of crashed exports, by age
+PARTIAL_SEGMENT_SUFFIX = ".partial.mp4"
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DiskCache:
+    # Files in one directory named "<key>.<suffix>". Reads refresh an entry's mtime, and the
+    # least recently used entries are evicted once the directory grows past max_bytes.
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+    def entry_path(self, key, suffix):
+        return os.path.join(self.directory, f"{key}.{suffix}")
+
+    def temp_path(self, key, suffix):
+        return f"{self.entry_path(key, suffix)}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    def touch(self, key, suffix):
+        try:
+            os.utime(self.entry_path(key, suffix))
+        except OSError:
+            pass
+
+    def evict(self):
+        with self.lock:
+            entries = {}
+            for name in os.listdir(self.directory):
+                if name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                key = name.split(".", 1)[0]
+                mtime, size, names = entries.get(key, (0.0, 0, []))
+                entries[key] = (max(mtime, stat.st_mtime), size + stat.st_size, names + [name])
+
+            total = sum(size for _, size, _ in entries.values())
+            for _, size, names in sorted(entries.values()):
+                if total <= self.max_bytes:
+                    break
+                for name in names:
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+                total -= size
+
+
+class TranscriptCache(DiskCache):
+    # Word-level Whisper results, one JSON file per (audio content, model, options)
+    def __init__(self, directory=TRANSCRIPT_CACHE_DIR, max_bytes=TRANSCRIPT_CACHE_MAX_BYTES):
+        super().__init__(directory, max_bytes)
+
+    def key(self, content_digest, engine_id, options):
+        digest = hashlib.sha256()
+        digest.update(content_digest.encode())
+        digest.update(engine_id.encode())
+        digest.update(json.dumps(options, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        try:
+            with open(self.entry_path(key, "json")) as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self.touch(key, "json")
+        return result
+
+    def put(self, key, result):
+        os.makedirs(self.directory, exist_ok=True)
+        temp_entry = self.temp_path(key, "json")
+        with open(temp_entry, "w") as f:
+            json.dump(result, f)
+        os.replace(temp_entry, self.entry_path(key, "json"))
+        self.evict()
+
+
+class EnvelopeCache(DiskCache):
+    # Envelope pyramids as a memory-mappable .npy plus a small .json header, with the
+    # per-channel pyramids and spectrum tables as sibling .npy files
+    def __init__(self, directory=ENVELOPE_CACHE_DIR, max_bytes=ENVELOPE_CACHE_MAX_BYTES):
+        super().__init__(directory, max_bytes)
+
+    def key(self, path):
+        digest = hashlib.sha256()
+        digest.update(file_digest(path).encode())
+        digest.update(f"{ENVELOPE_BASE_BIN}:{ENVELOPE_LEVELS}:channels".encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        envelope = AmplitudeEnvelope.load(self.entry_path(key, "npy"))
+        if envelope is not None:
+            self.touch(key, "json")
+        return envelope
+
+    def put(self, key, envelope):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.entry_path(key, "npy")
+        envelope.save(path, self.temp_path(key, "npy"))
+        self.evict()
+        return AmplitudeEnvelope.load(path) or envelope
+
+
+transcript_cache = TranscriptCache()
+envelope_cache = EnvelopeCache()
+
+
+def lock_directory(directory):
+    # Exclusive lock on directory/lock, held until the returned file is closed or the
+    # process exits; None if someone else holds it. OS locks, so a crashed export never
+    # leaves a stale lock behind, and two opens in one process still exclude each other.
+    try:
+        lock = open(os.path.join(directory, "lock"), "a+")
+    except OSError:
+        return None
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            lock.seek(0)
+            msvcrt.locking(lock.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        lock.close()
+        return None
+    return lock
+
+
+class ExportCheckpoint:
+    # Finished chunks of one export, kept in EXPORTS_DIR under a name derived from the
+    # output path and a hash of everything the frames depend on except the subtitles.
+    # manifest.json records each finished frame range with a hash of the subtitles it
+    # shows. The directory is locked while an export uses it: a second export with the
+    # same output and settings is refused, and checkpoints for the same output with other
+    # settings are dropped only when no export holds them.
+    def __init__(self, output_path, settings_hash, exports_dir=EXPORTS_DIR):
+        output_path = os.path.abspath(output_path)
+        output_key = hashlib.sha256(output_path.encode()).hexdigest()[:16]
+        self.directory = os.path.join(exports_dir, f"{output_key}-{settings_hash[:16]}")
+        self.manifest_path = os.path.join(self.directory, "manifest.json")
+        os.makedirs(self.directory, exist_ok=True)
+        self.lock = lock_directory(self.directory)
+        if self.lock is None:
+            raise RuntimeError(f"Another export to {output_path} with the same settings is running")
+
+        for name in os.listdir(exports_dir):
+            path = os.path.join(exports_dir, name)
+            if name.startswith(output_key + "-") and path != self.directory:
+                other = lock_directory(path)
+                if other is not None:
+                    other.close()
+                    shutil.rmtree(path, ignore_errors=True)
+
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = None
+        if manifest is None or manifest.get('settings_hash') != settings_hash:
+            manifest = {'output': output_path, 'settings_hash': settings_hash, 'segments': {}}
+        self.manifest = manifest
+
+        # Chunks that were still being encoded when the last run stopped
+        for name in os.listdir(self.directory):
+            if name.endswith(PARTIAL_SEGMENT_SUFFIX):
+                os.remove(os.path.join(self.directory, name))
+        self.save()
+
+    @staticmethod
+    def subtitles_hash(subtitles):
+        return hashlib.sha256(json.dumps(subtitles.rows()).encode()).hexdigest()
+
+    def is_done(self, index, start_frame, end_frame, subtitles_hash):
+        entry = self.manifest['segments'].get(str(index))
+        segment_path = os.path.join(self.directory, f"segment_{index:05d}.mp4")
+        return entry == [start_frame, end_frame, subtitles_hash] and os.path.isfile(segment_path)
+
+    def mark_done(self, index, start_frame, end_frame, subtitles_hash):
+        self.manifest['segments'][str(index)] = [start_frame, end_frame, subtitles_hash]
+        self.save()
+
+    def save(self):
+        temp_path = self.manifest_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.manifest, f)
+        os.replace(temp_path, self.manifest_path)
+
+    def release(self):
+        if self.lock is not None:
+            self.lock.close()
+            self.lock = None
+
+    def remove(self):
+        self.release()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def clean_stale_exports(exports_dir=EXPORTS_DIR):
+    # Drops checkpoints of exports abandoned long ago and the temp directories of exports
+    # that crashed; anything recent may belong to a running export and is left alone
+    now = time.time()
+    for parent, prefix, max_age in ((exports_dir, "", EXPORT_CHECKPOINT_MAX_AGE), (tempfile.gettempdir(), "whispervisualizer_", TEMP_DIR_MAX_AGE)):
+        try:
+            names = os.listdir(parent)
+        except OSError:
+            continue
+        for name in names:
+            path = os.path.join(parent, name)
+            try:
+                stale = name.startswith(prefix) and os.path.isdir(path) and now - os.path.getmtime(path) > max_age
+            except OSError:
+                continue
+            if stale and parent == exports_dir:
+                # A checkpoint an export still holds is in use however old it is
+                lock = lock_directory(path)
+                if lock is None:
+                    continue
+                lock.close()
+            if stale:
+                shutil.rmtree(path, ignore_errors=True)
+
+
+def compact_transcript(result):
+    # Keep only what chunk_segments needs, as plain JSON-serializable values
+    return {
+        'text': result.get('text', ''),
+        'language': result.get('language'),
+        'segments': [
+            {
+                'start': float(segment['start']),
+                'end': float(segment['end']),
+                'text': segment['text'],
+                'words': [
+                    {'word': w['word'], 'start': float(w['start']), 'end': float(w['end'])}
+                    for w in segment.get('words', [])
+                ]
+            }
+            for segment in result['segments']
+        ]
+    }
+
+
+def transcribe_audio(path, transcriber=None, cache=transcript_cache):
+    # Returns the raw word-level result; re-chunking for a new max_words never re-transcribes
+    transcriber = transcriber or load_transcriber()
+    key = None
+    if cache is not None:
+        key = cache.key(file_digest(path), transcriber.cache_id, TRANSCRIBE_OPTIONS)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    result = transcriber.transcribe(path)
+    if cache is not None:
+        cache.put(key, result)
+    return result
+
+
+STREAM_WINDOW_SECONDS = 30
+
+
+def transcribe_windows(path, transcriber, window_seconds=STREAM_WINDOW_SECONDS):
+    # Yields (segments, covered_until) per window. The last segment of each window may be
+    # cut off mid-word, so its audio is carried into the next window and transcribed again.
+    blocks = stream_audio(path, WHISPER_SAMPLE_RATE, window_seconds)
+    pending = np.zeros(0, dtype=np.float32)
+    offset = 0.0
+    block = next(blocks, None)
+    while block is not None:
+        next_block = next(blocks, None)
+        audio = np.concatenate([pending, block])
+        result = transcriber.transcribe(audio)
+        window_segments = result['segments']
+
+        cut = len(audio) / WHISPER_SAMPLE_RATE
+        if next_block is not None and len(window_segments) > 1 and window_segments[-1]['start'] > 0:
+            cut = window_segments[-1]['start']
+            window_segments = window_segments[:-1]
+
+        for segment in window_segments:
+            segment['start'] += offset
+            segment['end'] += offset
+            for word in segment['words']:
+                word['start'] += offset
+                word['end'] += offset
+        yield window_segments, result['language'], offset + cut
+
+        pending = audio[int(cut * WHISPER_SAMPLE_RATE):]
+        offset += cut
+        block = next_block
+
+
+def transcribe_streaming(path, store, max_words, transcriber=None, cache=transcript_cache):
+    # Appends word-chunked subtitles to store as each window finishes and returns the
+    # full word-level result. A cached full-file transcription is used when available.
+    transcriber = transcriber or load_transcriber()
+    full_key = stream_key = None
+    if cache is not None:
+        content_digest = file_digest(path)
+        full_key = cache.key(content_digest, transcriber.cache_id, TRANSCRIBE_OPTIONS)
+        stream_key = cache.key(content_digest, transcriber.cache_id, dict(TRANSCRIBE_OPTIONS, stream_window=STREAM_WINDOW_SECONDS))
+        for key in (full_key, stream_key):
+            cached = cache.get(key)
+            if cached is not None:
+                store.extend(chunk_segments(cached, max_words), float("inf"))
+                return cached
+
+    result = {'text': '', 'language': None, 'segments': []}
+    for window_segments, language, covered_until in transcribe_windows(path, transcriber):
+        result['segments'].extend(window_segments)
+        result['text'] += ''.join(segment['text'] for segment in window_segments)
+        result['language'] = result['language'] or language
+        store.extend(chunk_segments({'segments': window_segments}, max_words), covered_until)
+
+    if cache is not None:
+        cache.put(stream_key, result)
+    return result
+
+
+def fill_segment_store(path, store, max_words, transcriber=None, cache=transcript_cache, stream=False):
+    # Transcribes path into store (all at once, or window by window when stream is set),
+    # marks the store finished either way and returns the word-level result
+    try:
+        if stream:
+            result = transcribe_streaming(path, store, max_words, transcriber, cache)
+        else:
+            result = transcribe_audio(path, transcriber, cache)
+            store.extend(chunk_segments(result, max_words), float("inf"))
+    except Exception as e:
+        store.finish(e)
+        raise
+    store.finish()
+    return result
+
+
+def chunk_words(result, max_words):
+    # Splits each segment's words into runs of at most max_words
+    for segment in result['segments']:
+        words = segment['words']
+        for i in range(0, len(words), max_words):
+            yield words[i:i + max_words]
+
+
+def chunk_segments(result, max_words):
+    # One subtitle per run of words, timed from its first and last word
+    chunks = []
+    for words in chunk_words(result, max_words):
+        chunks.append({
+            'start': words[0]['start'],
+            'end': words[-1]['end'],
+            'text': ' '.join([w['word'] for w in words])
+        })
+    return chunks
+
+
+SUBTITLE_FORMATS = ["srt", "vtt", "ass"]
+SUBTITLE_MODES = ["burn", "soft", "none"]  # Drawn into the frames, muxed as a subtitle stream, or left out
+SOFT_SUBTITLE_CODECS = {".mp4": "mov_text", ".m4v": "mov_text", ".mov": "mov_text", ".mkv": "ass"}
+KARAOKE_UPCOMING_COLOR = "#FFFFFF"  # Words not reached yet; sung words take the subtitle color
+
+
+def soft_subtitle_codec(output_path):
+    extension = os.path.splitext(output_path)[1].lower()
+    if extension not in SOFT_SUBTITLE_CODECS:
+        raise ValueError(f"Soft subtitles need an MP4, MOV or MKV output, not {extension or output_path}")
+    return SOFT_SUBTITLE_CODECS[extension]
+
+
+def subtitle_rows(segments):
+    # (start, end, text) rows from a list of subtitle dicts, a SubtitleIndex or a SegmentStore;
+    # a store that is still being transcribed is waited for
+    if isinstance(segments, SegmentStore):
+        segments.wait_until(float("inf"))
+        segments = segments.index
+    if isinstance(segments, SubtitleIndex):
+        return segments.rows()
+    return sorted(((s['start'], s['end'], s['text']) for s in segments), key=lambda row: row[0])
+
+
+def format_timestamp(seconds, fmt):
+    # SRT 00:01:02,345, WebVTT 00:01:02.345, ASS 0:01:02.35
+    if fmt == "ass":
+        total = max(0, round(seconds * 100))
+        return f"{total // 360000}:{total // 6000 % 60:02d}:{total // 100 % 60:02d}.{total % 100:02d}"
+    total = max(0, round(seconds * 1000))
+    separator = "," if fmt == "srt" else "."
+    return f"{total // 3600000:02d}:{total // 60000 % 60:02d}:{total // 1000 % 60:02d}{separator}{total % 1000:03d}"
+
+
+def ass_color(color):
+    # "#RRGGBB" or an (r, g, b) tuple as an ASS &HAABBGGRR color
+    r, g, b = ImageColor.getrgb(color)[:3] if isinstance(color, str) else color[:3]
+    return f"&H00{b:02X}{g:02X}{r:02X}"
+
+
+def ass_escape(text):
+    # Braces would open override blocks and line breaks are written as \N
+    return text.replace("{", "(").replace("}", ")").replace("\n", "\\N")
+
+
+def ass_document(events, settings, karaoke=False):
+    # events are (start, end, text) with the text already escaped. Font, color, size and
+    # position match the burned-in subtitles at the settings' frame size.
+    font_size = subtitle_font_size(settings.height)
+    margin = max(0, round(settings.height * (1 - SUBTITLE_CENTER_Y) - font_size / 2))
+    primary = ass_color(settings.subtitle_color)
+    secondary = ass_color(KARAOKE_UPCOMING_COLOR) if karaoke else primary
+    lines = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {settings.width}",
+        f"PlayResY: {settings.height}",
+        "WrapStyle: 0",
+        "ScaledBorderAndShadow: yes",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, "
+        "ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding",
+        f"Style: Default,{settings.font},{font_size},{primary},{secondary},&H00000000,&H00000000,0,0,0,0,100,100,0,0,1,0,0,2,10,10,{margin},1",
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+    ]
+    for start, end, text in events:
+        lines.append(f"Dialogue: 0,{format_timestamp(start, 'ass')},{format_timestamp(end, 'ass')},Default,,0,0,0,,{text}")
+    return "\n".join(lines) + "\n"
+
+
+def subtitle_text(segments, fmt, settings=None):
+    # The word-chunked subtitles as an SRT, WebVTT or ASS document
+    # Whisper words carry their leading space, so chunk texts are re-spaced
+    rows = [(start, end, " ".join(text.split())) for start, end, text in subtitle_rows(segments) if text.strip()]
+    if fmt == "ass":
+        return ass_document([(start, end, ass_escape(text)) for start, end, text in rows], settings or RenderSettings())
+
+    lines = ["WEBVTT", ""] if fmt == "vtt" else []
+    for number, (start, end, text) in enumerate(rows, 1):
+        if fmt == "vtt":
+            text = text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+        else:
+            lines.append(str(number))
+        lines.append(f"{format_timestamp(start, fmt)} --> {format_timestamp(end, fmt)}")
+        lines += [text, ""]
+    return "\n".join(lines)
+
+
+def karaoke_ass(result, max_words, settings=None):
+    # Word-level karaoke from the Whisper word timestamps: one line per subtitle chunk in
+    # which each word lights up at its start time ({\k} durations are in centiseconds)
+    events = []
+    for words in chunk_words(result, max_words):
+        elapsed = round(words[0]['start'] * 100)
+        parts = []
+        for i, word in enumerate(words):
+            until = words[i + 1]['start'] if i + 1 < len(words) else word['end']
+            stop = max(elapsed, round(until * 100))
+            parts.append(f"{{\\k{stop - elapsed}}}{ass_escape(word['word'].strip())}")
+            elapsed = stop
+        events.append((words[0]['start'], words[-1]['end'], " ".join(parts)))
+    return ass_document(events, settings or RenderSettings(), karaoke=True)
+
+
+def load_envelope(path, cache=envelope_cache, spectrum=None):
+    # Builds the envelopes (mono mix and per channel) in one streaming decode pass unless
+    # they are already cached. spectrum=(fps, bands) also makes sure the envelope carries
+    # that spectrum table; it is computed in the same pass, or in a mono pass of its own
+    # when only the table is missing from the cache.
+    key = None
+    envelope = None
+    if cache is not None:
+        key = cache.key(path)
+        envelope = cache.get(key)
+        if envelope is not None and (spectrum is None or envelope.spectrum(*spectrum) is not None):
+            return envelope
+
+    if envelope is None:
+        channels = probe_channels(path)
+        builder = FeatureBuilder(DECODE_SAMPLE_RATE, channels, [spectrum] if spectrum else [])
+        for block in stream_audio(path, channels=channels):
+            builder.update(block)
+        envelope = builder.finish()
+    else:
+        builder = SpectrumBuilder(DECODE_SAMPLE_RATE, *spectrum)
+        for block in stream_audio(path):
+            builder.update(block)
+        envelope.spectra[spectrum] = builder.finish()
+
+    if cache is not None:
+        try:
+            envelope = cache.put(key, envelope)
+        except OSError:
+            pass
+    return envelope
+
+
+def export_video_file(audio_path, output_path, segments, settings, quality=None, workers=1, chunk_seconds=60, envelope=None, timings=None, show_progress=True, progress=None, profile=DEFAULT_PROFILE, soft_subtitles=None, checkpoint=False):
+    # Renders audio_path with its subtitle chunks to output_path; envelope may be passed
+    # in when the caller already loaded it. profile is a RENDER_PROFILES name or a dict
+    # from build_profile. progress(frames_done, total_frames) is called as frames are encoded.
+    # soft_subtitles(settings), if given, returns an ASS document that is muxed as a subtitle
+    # stream instead of drawing segments into the frames. It is called after the frames are
+    # encoded, so a streaming transcription can keep running while they render.
+    # checkpoint encodes chunk_seconds segments that survive a crash; running the same
+    # export again only renders the segments that are missing.
+    from tqdm import tqdm
+
+    if timings is None:
+        timings = {}
+
+    # Every export sweeps up after crashed ones, checkpointed or not
+    clean_stale_exports()
+
+    if isinstance(profile, str):
+        profile = build_profile(profile)
+    subtitle_codec = None
+    if soft_subtitles:
+        subtitle_codec = soft_subtitle_codec(output_path)
+        segments = None
+    fps = profile['fps']
+    settings = settings.replace(width=profile['width'], height=profile['height'], bars=profile['bars'], fps=fps)
+    codec_params = encoder_params(profile, quality)
+
+    started = time.perf_counter()
+    spectrum = (fps, settings.bars) if settings.style == "Spectrum" else None
+    if envelope is None or (spectrum and envelope.spectrum(*spectrum) is None):
+        envelope = load_envelope(audio_path, spectrum=spectrum)
+    timings['decode'] = time.perf_counter() - started
+
+    # Calculate total frames
+    total_frames = int(envelope.duration * fps)
+    timings['frames'] = total_frames
+
+    export_checkpoint = None
+    if checkpoint:
+        settings_hash = hashlib.sha256(json.dumps({
+            'audio': file_digest(audio_path),
+            'settings': dataclasses.asdict(settings),
+            'fps': fps,
+            'frames': total_frames,
+            'chunk_seconds': chunk_seconds,
+            'codec': codec_params,
+        }, sort_keys=True).encode()).hexdigest()
+        export_checkpoint = ExportCheckpoint(output_path, settings_hash)
+
+    # Render frames and write to video. A single ffmpeg process reads raw frames from
+    # its stdin and the audio straight from the source file, and writes the final
+    # container; there is no intermediate WAV, video-only file or second mux pass.
+    started = time.perf_counter()
+    workers = max(1, workers)
+    work_dir = tempfile.mkdtemp(prefix="whispervisualizer_") if soft_subtitles else None
+
+    def subtitle_track():
+        subtitle_path = os.path.join(work_dir, "subtitles.ass")
+        with open(subtitle_path, "w", encoding="utf-8") as f:
+            f.write(soft_subtitles(settings))
+        return subtitle_path, subtitle_codec
+
+    with tqdm(total=total_frames, desc="Exporting video", disable=not show_progress) as bar:
+        frames_done = 0
+
+        def advance(frames):
+            nonlocal frames_done
+            frames_done += frames
+            bar.update(frames)
+            if progress:
+                progress(frames_done, total_frames)
+
+        try:
+            if workers > 1 or export_checkpoint:
+                render_video_parallel(
+                    output_path, audio_path, envelope, fps, total_frames, codec_params, settings, segments, workers, chunk_seconds,
+                    progress=advance, audio_params=profile['audio'], subtitle_track=subtitle_track if soft_subtitles else None,
+                    checkpoint=export_checkpoint
+                )
+            else:
+                # imageio cannot add a third input, so soft subtitles are muxed into a stream copy afterwards
+                video_path = os.path.join(work_dir, "video" + os.path.splitext(output_path)[1]) if soft_subtitles else output_path
+                writer = imageio.get_writer(
+                    video_path, fps=fps, codec='libx264', quality=None, macro_block_size=2, ffmpeg_log_level='error',
+                    audio_path=audio_path, output_params=codec_params + profile['audio']
+                )
+                for frame_image in render_frames(envelope, fps, 0, total_frames, settings, segments, rgbx=True):
+                    writer.append_data(frame_image)
+                    advance(1)
+                writer.close()
+                if soft_subtitles:
+                    mux_subtitles(video_path, *subtitle_track(), output_path)
+        finally:
+            if work_dir:
+                shutil.rmtree(work_dir, ignore_errors=True)
+            if export_checkpoint:
+                export_checkpoint.release()
+    timings['render'] = time.perf_counter() - started
+    return timings
 
 class WaveformApp(ttk.Window):  
     def __init__(self):
@@ -38,7 +1882,6 @@ class WaveformApp(ttk.Window):
         self.init_variables()
         self.create_widgets()
         pygame.init()
-        self.screen = pygame.Surface((900, 400))
 
         # Update the window size based on the content
         self.update_idletasks()
@@ -46,15 +1889,45 @@ class WaveformApp(ttk.Window):
         self.geometry(f"{self.winfo_width()}x{self.winfo_height()}")
 
     def init_variables(self):
+        # Per-window state; worker threads get snapshots of it as arguments
+        self.audio_file = None
+        self.playback_running = False
+        self.waveform_color = RenderSettings.waveform_color
+        self.subtitle_color = RenderSettings.subtitle_color
         self.rainbow_var = tk.IntVar()
         self.max_words_var = tk.IntVar(value=10)
         self.font_var = tk.StringVar(value="Arial")
         self.waveform_style_var = tk.StringVar(value="Line")
         self.amplitude_scale_var = tk.DoubleVar(value=1.0)
+        self.window_seconds_var = tk.DoubleVar(value=1.0)
         self.playback_position_var = tk.DoubleVar(value=0.0)
         self.playback_paused = False
+        self.transcription = None
+        self.envelope = None
+        self.segment_store = SegmentStore()
+        self.transcription_generation = 0
+        self.stream_transcription_var = tk.IntVar(value=1)
+        self.engine_var = tk.StringVar(value="whisper")
+        self.model_var = tk.StringVar(value="base")
+        self.engine_var.trace_add("write", self.reset_transcription)
+        self.model_var.trace_add("write", self.reset_transcription)
+        # The preview renderer gets a new settings snapshot only when one of these changes
+        for var in (self.rainbow_var, self.font_var, self.waveform_style_var, self.amplitude_scale_var, self.window_seconds_var):
+            var.trace_add("write", self.push_render_settings)
+        self.preview_renderer = None
+        self.playback_clock = PlaybackClock()
+        self.preview_tick_job = None
+        self.current_subtitle = None
+        self.present_timer = FrameTimer()
+        self.preview_stats_var = tk.StringVar(value="")
+        self.preview_stats_updated = 0.0
         self.export_format_var = tk.StringVar(value="mp4")
-        self.export_quality_var = tk.StringVar(value="High")
+        self.export_profile_var = tk.StringVar(value=DEFAULT_PROFILE)
+        self.export_workers_var = tk.IntVar(value=1)
+        self.export_chunk_var = tk.IntVar(value=60)
+        self.export_checkpoint_var = tk.IntVar(value=0)
+        self.export_subtitles_var = tk.StringVar(value="burn")
+        self.karaoke_var = tk.IntVar()
 
     def create_widgets(self):
         # Main Frame
@@ -69,11 +1942,18 @@ class WaveformApp(ttk.Window):
         upload_btn.pack(pady=5)
 
         # Canvas for visualization
-        self.canvas = tk.Canvas(main_frame, width=900, height=400, highlightthickness=0, bg="black")
+        self.canvas = tk.Canvas(main_frame, width=CANVAS_WIDTH, height=CANVAS_HEIGHT, highlightthickness=0, bg="black")
         self.canvas.pack(pady=10)
         self.canvas_image = self.canvas.create_image(0, 0, anchor=tk.NW)
         self.canvas.tag_lower(self.canvas_image)
 
+        # One persistent PhotoImage; preview frames are pasted into it
+        self.preview_photo = ImageTk.PhotoImage("RGB", (CANVAS_WIDTH, CANVAS_HEIGHT))
+        self.canvas.itemconfig(self.canvas_image, image=self.preview_photo)
+
+        preview_stats_label = ttk.Label(main_frame, textvariable=self.preview_stats_var)
+        preview_stats_label.pack()
+
         # Controls Frame
         controls_frame = ttk.Frame(main_frame)
         controls_frame.pack(pady=5)
@@ -110,7 +1990,7 @@ class WaveformApp(ttk.Window):
         waveform_color_btn = ttk.Button(waveform_frame, text="Select Waveform Color", command=self.choose_waveform_color)
         waveform_color_btn.pack(pady=5, fill=tk.X)
 
-        rainbow_check = ttk.Checkbutton(waveform_frame, text="Enable Rainbow Effect", variable=self.rainbow_var, command=self.toggle_rainbow)
+        rainbow_check = ttk.Checkbutton(waveform_frame, text="Enable Rainbow Effect", variable=self.rainbow_var)
         rainbow_check.pack(pady=5, anchor="w")
 
         waveform_style_label = ttk.Label(waveform_frame, text="Waveform Style:")
@@ -125,6 +2005,12 @@ class WaveformApp(ttk.Window):
         amplitude_scale_slider = ttk.Scale(waveform_frame, from_=0.1, to=5.0, variable=self.amplitude_scale_var, orient=tk.HORIZONTAL)
         amplitude_scale_slider.pack(pady=5, fill=tk.X)
 
+        window_seconds_label = ttk.Label(waveform_frame, text="Zoom Window (s):")
+        window_seconds_label.pack(pady=5, anchor="w")
+
+        window_seconds_menu = ttk.Combobox(waveform_frame, textvariable=self.window_seconds_var, values=WAVEFORM_WINDOWS, state="readonly")
+        window_seconds_menu.pack(pady=5, fill=tk.X)
+
         # Subtitle Settings
         subtitle_frame = ttk.Labelframe(settings_frame, text="Subtitle Settings", padding=10)
         subtitle_frame.grid(row=0, column=1, padx=5, pady=5, sticky="nsew")
@@ -144,6 +2030,21 @@ class WaveformApp(ttk.Window):
         max_words_spinbox = ttk.Spinbox(subtitle_frame, from_=1, to=20, textvariable=self.max_words_var)
         max_words_spinbox.pack(pady=5, fill=tk.X)
 
+        stream_check = ttk.Checkbutton(subtitle_frame, text="Stream Transcription", variable=self.stream_transcription_var)
+        stream_check.pack(pady=5, anchor="w")
+
+        engine_label = ttk.Label(subtitle_frame, text="Transcription Engine:")
+        engine_label.pack(pady=5)
+
+        engine_dropdown = ttk.Combobox(subtitle_frame, textvariable=self.engine_var, values=["whisper", "faster-whisper"], state="readonly")
+        engine_dropdown.pack(pady=5, fill=tk.X)
+
+        model_label = ttk.Label(subtitle_frame, text="Model Size:")
+        model_label.pack(pady=5)
+
+        model_dropdown = ttk.Combobox(subtitle_frame, textvariable=self.model_var, values=WHISPER_MODEL_SIZES, state="readonly")
+        model_dropdown.pack(pady=5, fill=tk.X)
+
         # Export Settings
         export_frame = ttk.Labelframe(settings_frame, text="Export Settings", padding=10)
         export_frame.grid(row=0, column=2, padx=5, pady=5, sticky="nsew")
@@ -154,11 +2055,38 @@ class WaveformApp(ttk.Window):
         export_format_menu = ttk.Combobox(export_frame, textvariable=self.export_format_var, values=["mp4", "avi", "mkv"], state="readonly")
         export_format_menu.pack(pady=5, fill=tk.X)
 
-        export_quality_label = ttk.Label(export_frame, text="Export Quality:")
-        export_quality_label.pack(pady=5, anchor="w")
+        export_profile_label = ttk.Label(export_frame, text="Render Profile:")
+        export_profile_label.pack(pady=5, anchor="w")
 
-        export_quality_menu = ttk.Combobox(export_frame, textvariable=self.export_quality_var, values=["Low", "Medium", "High"], state="readonly")
-        export_quality_menu.pack(pady=5, fill=tk.X)
+        export_profile_menu = ttk.Combobox(export_frame, textvariable=self.export_profile_var, values=list(RENDER_PROFILES), state="readonly")
+        export_profile_menu.pack(pady=5, fill=tk.X)
+
+        export_workers_label = ttk.Label(export_frame, text="Export Workers:")
+        export_workers_label.pack(pady=5, anchor="w")
+
+        export_workers_spinbox = ttk.Spinbox(export_frame, from_=1, to=os.cpu_count() or 1, textvariable=self.export_workers_var)
+        export_workers_spinbox.pack(pady=5, fill=tk.X)
+
+        export_chunk_label = ttk.Label(export_frame, text="Chunk Length (s):")
+        export_chunk_label.pack(pady=5, anchor="w")
+
+        export_chunk_spinbox = ttk.Spinbox(export_frame, from_=5, to=600, increment=5, textvariable=self.export_chunk_var)
+        export_chunk_spinbox.pack(pady=5, fill=tk.X)
+
+        export_checkpoint_check = ttk.Checkbutton(export_frame, text="Resumable Export", variable=self.export_checkpoint_var)
+        export_checkpoint_check.pack(pady=5, anchor="w")
+
+        export_subtitles_label = ttk.Label(export_frame, text="Subtitles:")
+        export_subtitles_label.pack(pady=5, anchor="w")
+
+        export_subtitles_menu = ttk.Combobox(export_frame, textvariable=self.export_subtitles_var, values=SUBTITLE_MODES, state="readonly")
+        export_subtitles_menu.pack(pady=5, fill=tk.X)
+
+        karaoke_check = ttk.Checkbutton(export_frame, text="Karaoke (ASS)", variable=self.karaoke_var)
+        karaoke_check.pack(pady=5, anchor="w")
+
+        save_subtitles_btn = ttk.Button(export_frame, text="Save Subtitles", command=self.save_subtitles)
+        save_subtitles_btn.pack(pady=5, fill=tk.X)
 
         # Progress Bar
         self.progress = ttk.Progressbar(main_frame, mode="determinate", length=400)
@@ -168,36 +2096,43 @@ class WaveformApp(ttk.Window):
         export_btn = ttk.Button(main_frame, text="Select Output Location & Export", command=self.export_video, width=30)
         export_btn.pack(pady=10)
 
-    def toggle_rainbow(self):
-        global rainbow_effect
-        rainbow_effect = bool(self.rainbow_var.get())
-
     def open_audio(self):
-        global audio_file
         audio_file = filedialog.askopenfilename(title="Select Audio File", filetypes=[("Audio Files", "*.wav *.mp3 *.m4a *.flac *.ogg *.aac")])
         if audio_file:
+            self.audio_file = audio_file
+            self.reset_transcription()
+            self.envelope = None
             self.preview_btn.config(state=tk.NORMAL)
             messagebox.showinfo("File Uploaded", "Audio file uploaded successfully!")
 
+    def reset_transcription(self, *args):
+        # New file, engine or model: the subtitles have to be transcribed again
+        self.transcription = None
+        self.segment_store = SegmentStore()
+        # Results of transcriptions started before this point are dropped
+        self.transcription_generation += 1
+
     def start_preview(self):
-        global playback_running, max_words
-        max_words = self.max_words_var.get()
-        if audio_file:
-            playback_running = True
+        if self.audio_file:
+            self.playback_running = True
             self.progress.start()
             self.preview_btn.config(state=tk.DISABLED)
             self.stop_btn.config(state=tk.NORMAL)
             self.pause_btn.config(state=tk.NORMAL)
             self.playback_paused = False
 
-            # Start transcription in a separate thread
-            threading.Thread(target=self.transcribe_and_preview).start()
+            # Start transcription in a separate thread; Tk variables and the current results are read here,
+            # and the thread hands its results back through play_audio_with_waveform
+            options = (self.audio_file, self.max_words_var.get(), self.engine_var.get(), self.model_var.get(), self.stream_transcription_var.get())
+            current = (self.transcription_generation, self.envelope, self.transcription, self.segment_store)
+            threading.Thread(target=self.transcribe_and_preview, args=options + current).start()
         else:
             messagebox.showerror("Error", "Please select an audio file first.")
 
     def pause_preview(self):
         if not self.playback_paused:
             pygame.mixer.music.pause()
+            self.playback_clock.pause()
             self.playback_paused = True
             self.pause_btn.config(state=tk.DISABLED)
             self.resume_btn.config(state=tk.NORMAL)
@@ -205,15 +2140,21 @@ class WaveformApp(ttk.Window):
     def resume_preview(self):
         if self.playback_paused:
             pygame.mixer.music.unpause()
+            self.playback_clock.resume()
             self.playback_paused = False
             self.pause_btn.config(state=tk.NORMAL)
             self.resume_btn.config(state=tk.DISABLED)
 
     def stop_preview(self):
-        global playback_running
-        playback_running = False
+        self.playback_running = False
+        if self.preview_tick_job is not None:
+            self.after_cancel(self.preview_tick_job)
+            self.preview_tick_job = None
         pygame.mixer.music.stop()
+        if self.preview_renderer is not None:
+            self.preview_renderer.stop()
         self.canvas.delete("subtitle")
+        self.current_subtitle = None
         self.preview_btn.config(state=tk.NORMAL)
         self.pause_btn.config(state=tk.DISABLED)
         self.resume_btn.config(state=tk.DISABLED)
@@ -221,302 +2162,815 @@ class WaveformApp(ttk.Window):
         self.progress.stop()
         self.playback_slider.set(0)
 
-    def transcribe_and_preview(self):
-        global segments
+    def transcribe_and_preview(self, audio_file, max_words, engine, model_name, stream,
+                               generation, envelope, transcription, store):
         try:
             self.progress.config(mode="indeterminate")
             self.progress.start()
 
-            # Load the whisper model once to prevent lag
-            if not hasattr(self, 'whisper_model'):
-                self.whisper_model = whisper.load_model("base")
-            result = self.whisper_model.transcribe(audio_file, word_timestamps=True)
-
-            segments = []
-
-            # Process each segment and split into chunks with accurate timing
-            for segment in result['segments']:
-                words = segment['words']
-                num_words = len(words)
-                i = 0
-                while i < num_words:
-                    chunk_words = words[i:i + max_words]
-                    chunk_text = ' '.join([w['word'] for w in chunk_words])
-                    chunk_start = chunk_words[0]['start']
-                    chunk_end = chunk_words[-1]['end']
-                    segments.append({
-                        'start': chunk_start,
-                        'end': chunk_end,
-                        'text': chunk_text
-                    })
-                    i += max_words
+            # Preload the amplitude envelope once, off the Tk thread
+            if envelope is None:
+                envelope = load_envelope(audio_file, spectrum=(PREVIEW_FPS, WAVEFORM_SAMPLES))
+
+            if transcription is not None:
+                # Only the cheap chunking step when the file was already transcribed
+                store = SegmentStore(chunk_segments(transcription, max_words))
+            elif not store.finished:
+                # A streaming transcription of this file is still running; keep playing from it
+                store.wait_until(0.0)
+            elif stream:
+                # Play as soon as the first window is transcribed; the rest keeps streaming in
+                store = SegmentStore(complete=False)
+                transcriber = load_transcriber(engine, model_name)
+                threading.Thread(target=self.stream_transcription, args=(audio_file, store, max_words, transcriber, generation), daemon=True).start()
+                store.wait_until(0.0)
+            else:
+                store = SegmentStore(complete=False)
+                transcriber = load_transcriber(engine, model_name)
+                transcription = fill_segment_store(audio_file, store, max_words, transcriber)
 
             self.progress.stop()
             self.progress.config(mode="determinate")
-            self.after(0, self.play_audio_with_waveform)
+            results = (generation, envelope, transcription, store)
+            self.after(0, lambda: self.play_audio_with_waveform(audio_file, *results))
         except Exception as e:
             self.progress.stop()
             messagebox.showerror("Error", f"An error occurred during transcription: {e}")
 
-    def play_audio_with_waveform(self):
+    def stream_transcription(self, path, store, words_per_chunk, transcriber, generation):
+        try:
+            transcription = fill_segment_store(path, store, words_per_chunk, transcriber, stream=True)
+            self.after(0, lambda: self.finish_transcription(generation, transcription))
+        except Exception as e:
+            # Failures before the first window are reported by transcribe_and_preview
+            if store.covered_until > 0:
+                message = f"An error occurred during transcription: {e}"
+                self.after(0, lambda: messagebox.showerror("Error", message))
+
+    def finish_transcription(self, generation, transcription):
+        # Drop the result if another file, engine or model was chosen in the meantime
+        if generation == self.transcription_generation:
+            self.transcription = transcription
+
+    def play_audio_with_waveform(self, audio_file, generation, envelope, transcription, store):
+        # Another file was opened while this one was loading: its results no longer apply
+        if generation != self.transcription_generation or audio_file != self.audio_file:
+            self.stop_preview()
+            return
+        self.envelope = envelope
+        self.segment_store = store
+        if transcription is not None:
+            self.transcription = transcription
         try:
             pygame.mixer.init()
             pygame.mixer.music.load(audio_file)
             pygame.mixer.music.play()
             pygame.mixer.music.set_endevent(pygame.USEREVENT)
-            self.playback_duration = librosa.get_duration(filename=audio_file)
-
-            # Preload and process audio data once
-            if not hasattr(self, 'amplitudes'):
-                y, sr = librosa.load(audio_file, sr=None)
-                self.duration = librosa.get_duration(y=y, sr=sr)
-                self.amplitudes = np.abs(y)
-                self.samples_len = len(self.amplitudes)
-
-            self.run_waveform_visualization()
-            self.update_subtitles()
-            self.update_playback_slider()
+            self.playback_clock.start(0.0)
+            self.playback_duration = self.envelope.duration
+
+            # Frames are produced off the Tk thread; preview_tick only presents them
+            if self.preview_renderer is not None:
+                self.preview_renderer.stop()
+            self.preview_renderer = PreviewRenderer(self.envelope, clock=self.playback_clock)
+            self.push_render_settings()
+            self.preview_renderer.start()
+            self.present_timer = FrameTimer()
+
+            if self.preview_tick_job is not None:
+                self.after_cancel(self.preview_tick_job)
+            self.preview_tick()
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred during playback: {e}")
 
     def seek_audio(self, value):
-        if playback_running:
+        if self.playback_running:
             position = float(value)
             new_time = (position / 100.0) * self.playback_duration
             pygame.mixer.music.play(start=new_time)
+            self.playback_clock.start(new_time)
             self.playback_paused = False
             self.pause_btn.config(state=tk.NORMAL)
             self.resume_btn.config(state=tk.DISABLED)
 
-    def update_playback_slider(self):
-        if playback_running and pygame.mixer.music.get_busy():
-            current_time = pygame.mixer.music.get_pos() / 1000.0
-            position = (current_time / self.playback_duration) * 100.0
-            self.playback_position_var.set(position)
-            self.after(100, self.update_playback_slider)  
-        else:
-            self.playback_position_var.set(0)
-
-    def run_waveform_visualization(self):
-        if playback_running and pygame.mixer.music.get_busy():
-            self.screen.fill((0, 0, 0))  
-            current_time = pygame.mixer.music.get_pos() / 1000
-            current_sample = int((current_time / self.duration) * self.samples_len)
-            amplitude_scale = self.amplitude_scale_var.get()
-            waveform_style = self.waveform_style_var.get()
-            num_samples = 200  
-
-            for i in range(current_sample, min(current_sample + num_samples, self.samples_len)):
-                amp = self.amplitudes[i] * amplitude_scale
-                bar_height = int(amp * 200)
-                x_pos = int((i - current_sample) * (900 / num_samples))
-                color = self.get_waveform_color(i)
-                if waveform_style == "Line":
-                    pygame.draw.line(self.screen, color, (x_pos, 200 - bar_height // 2), (x_pos, 200 + bar_height // 2), 2)
-                elif waveform_style == "Bar":
-                    pygame.draw.rect(self.screen, color, (x_pos, 200 - bar_height // 2, 3, bar_height))
-                elif waveform_style == "Filled":
-                    pygame.draw.polygon(self.screen, color, [(x_pos, 200), (x_pos, 200 - bar_height // 2), (x_pos + 3, 200 - bar_height // 2), (x_pos + 3, 200)])
-
-            pygame_image = pygame.surfarray.array3d(self.screen)
-            pygame_image = np.transpose(pygame_image, (1, 0, 2))
-            img = Image.fromarray(pygame_image)
-            imgtk = ImageTk.PhotoImage(image=img)
-            self.canvas.image = imgtk  # Keep a reference
-            self.canvas.itemconfig(self.canvas_image, image=imgtk)
-            self.after(33, self.run_waveform_visualization)
-        else:
-            self.progress.stop()
-
-    def get_waveform_color(self, index):
-        if rainbow_effect:
-            colors = [
-                (255, 0, 0),     # Red
-                (255, 127, 0),   # Orange
-                (255, 255, 0),   # Yellow
-                (0, 255, 0),     # Green
-                (0, 0, 255),     # Blue
-                (75, 0, 130),    # Indigo
-                (148, 0, 211)    # Violet
-            ]
-            return colors[index % len(colors)]
-        return waveform_color
-
-    def update_subtitles(self):
-        current_time = pygame.mixer.music.get_pos() / 1000
-        subtitle = ""
-        for segment in segments:
-            if segment['start'] <= current_time <= segment['end']:
-                subtitle = segment['text']
-                break
-
-        if getattr(self, "current_subtitle", None) != subtitle:
+    def preview_tick(self):
+        # Presents the newest frame and updates the subtitle and slider, all from one
+        # clock reading, then schedules itself again until playback ends
+        self.preview_tick_job = None
+        current_time = self.playback_clock()
+        if not self.playback_paused and (current_time >= self.playback_duration or not pygame.mixer.music.get_busy()):
+            self.stop_preview()
+            return
+
+        image = self.preview_renderer.take()
+        if image is not None:
+            started = time.perf_counter()
+            self.preview_photo.paste(image)
+            self.present_timer.add(time.perf_counter() - started)
+
+        self.update_subtitle(current_time)
+        self.playback_position_var.set((current_time / self.playback_duration) * 100.0)
+        self.update_preview_stats()
+        self.preview_tick_job = self.after(PREVIEW_TICK_MS, self.preview_tick)
+
+    def update_preview_stats(self):
+        now = time.perf_counter()
+        if now - self.preview_stats_updated < 0.5:
+            return
+        self.preview_stats_updated = now
+        renderer = self.preview_renderer
+        self.preview_stats_var.set(
+            f"{self.present_timer.fps():.1f} fps | "
+            f"render p95 {renderer.render_timer.p95() * 1000:.1f} ms | "
+            f"present p95 {self.present_timer.p95() * 1000:.1f} ms | "
+            f"dropped {renderer.dropped}"
+        )
+
+    def push_render_settings(self, *_):
+        if self.preview_renderer is None:
+            return
+        try:
+            self.preview_renderer.update_settings(self.render_settings())
+        except tk.TclError:
+            pass  # A spinbox mid-edit holds no number yet; keep the last settings
+
+    def render_settings(self):
+        # Snapshot of the current settings, safe to hand to worker threads and processes
+        return RenderSettings(
+            style=self.waveform_style_var.get(),
+            amplitude_scale=self.amplitude_scale_var.get(),
+            window_seconds=self.window_seconds_var.get(),
+            waveform_color=self.waveform_color,
+            rainbow=bool(self.rainbow_var.get()),
+            font=self.font_var.get(),
+            subtitle_color=self.subtitle_color,
+        )
+
+    def update_subtitle(self, current_time):
+        subtitle = self.segment_store.text_at(current_time)
+        if self.current_subtitle != subtitle:
             self.current_subtitle = subtitle
             self.canvas.delete("subtitle")
             selected_font = (self.font_var.get(), 18)
-            self.canvas.create_text(450, 375, text=subtitle, fill=subtitle_color, font=selected_font, anchor="center", width=800, tags="subtitle")
-        if playback_running and pygame.mixer.music.get_busy():
-            self.after(200, self.update_subtitles)  
+            self.canvas.create_text(450, 375, text=subtitle, fill=self.subtitle_color, font=selected_font, anchor="center", width=800, tags="subtitle")
 
     def choose_waveform_color(self):
-        global waveform_color
         color = colorchooser.askcolor()[0]
         if color:
-            waveform_color = tuple(map(int, color))
+            self.waveform_color = tuple(map(int, color))
+            self.push_render_settings()
 
     def choose_subtitle_color(self):
-        global subtitle_color
         color = colorchooser.askcolor()[1]
         if color:
-            subtitle_color = color
+            self.subtitle_color = color
 
     def export_video(self):
         output_format = self.export_format_var.get().lower()
-        quality = self.export_quality_var.get()
+        profile = self.export_profile_var.get()
         output_path = filedialog.asksaveasfilename(defaultextension=f".{output_format}", filetypes=[(f"{output_format.upper()} files", f"*.{output_format}")])
         if output_path:
             try:
-                from tqdm import tqdm  
-
                 self.progress.config(mode="indeterminate")
                 self.progress.start()
 
                 # Prepare variables
-                if not hasattr(self, 'amplitudes'):
-                    y, sr = librosa.load(audio_file, sr=None)
-                    duration = librosa.get_duration(y=y, sr=sr)
-                    amplitudes = np.abs(y)
-                    samples_len = len(amplitudes)
-                    self.amplitudes = amplitudes
-                    self.samples_len = samples_len
-                    self.duration = duration
-
-                else:
-                    amplitudes = self.amplitudes
-                    samples_len = self.samples_len
-                    duration = self.duration
-
-                # Prepare font for subtitles
-                font_name = self.font_var.get()
-                font_size = 18
-                font = pygame.font.SysFont(font_name, font_size)
-
-                # Convert subtitle color to RGB tuple
-                subtitle_color_rgb = pygame.Color(subtitle_color)
-
-                # Calculate total frames
-                fps = 30
-                total_frames = int(duration * fps)
-
-                # Quality settings
-                if quality == "High":
-                    codec_quality = 10  
-                elif quality == "Medium":
-                    codec_quality = 20
-                else:
-                    codec_quality = 30
-
-                # Use imageio to write video
-                writer = imageio.get_writer(output_path, fps=fps, codec='libx264', quality=codec_quality, ffmpeg_log_level='error')
-
-                # Load audio data for writing into video
-                audio_data, audio_sr = librosa.load(audio_file, sr=None)
-
-                # Resample audio to 44100 Hz for compatibility
-                if audio_sr != 44100:
-                    audio_data = librosa.resample(audio_data, orig_sr=audio_sr, target_sr=44100)
-                    audio_sr = 44100
-
-                # Prepare audio for writing
-                audio_data = (audio_data * 32767).astype(np.int16)  # Convert to 16-bit PCM
-
-                # Create a temporary file for the audio
-                import tempfile
-                import soundfile as sf
-
-                temp_audio_file = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-                sf.write(temp_audio_file.name, audio_data, audio_sr, subtype='PCM_16')
-
-                # Render frames and write to video
-                for frame_num in tqdm(range(total_frames), desc="Exporting video"):
-                    t = frame_num / fps
-
-                    # Create a new surface
-                    screen = pygame.Surface((900, 400))
-
-                    # Fill background
-                    screen.fill((0, 0, 0))
-
-                    # Compute current sample
-                    current_sample = int((t / duration) * samples_len)
-                    amplitude_scale = self.amplitude_scale_var.get()
-                    waveform_style = self.waveform_style_var.get()
-                    num_samples = 200  
-
-                    for i in range(current_sample, min(current_sample + num_samples, samples_len)):
-                        amp = amplitudes[i] * amplitude_scale
-                        bar_height = int(amp * 200)
-                        x_pos = int((i - current_sample) * (900 / num_samples))
-                        color = self.get_waveform_color(i)
-                        if waveform_style == "Line":
-                            pygame.draw.line(screen, color, (x_pos, 200 - bar_height // 2), (x_pos, 200 + bar_height // 2), 2)
-                        elif waveform_style == "Bar":
-                            pygame.draw.rect(screen, color, (x_pos, 200 - bar_height // 2, 3, bar_height))
-                        elif waveform_style == "Filled":
-                            pygame.draw.polygon(screen, color, [(x_pos, 200), (x_pos, 200 - bar_height // 2), (x_pos + 3, 200 - bar_height // 2), (x_pos + 3, 200)])
-
-                    # Render subtitle
-                    subtitle = ""
-                    for segment in segments:
-                        if segment['start'] <= t <= segment['end']:
-                            subtitle = segment['text']
-                            break
-                    if subtitle:
-                        text_surface = font.render(subtitle, True, subtitle_color_rgb)
-                        text_rect = text_surface.get_rect(center=(450, 375))
-                        screen.blit(text_surface, text_rect)
-
-                    # Convert frame to numpy array
-                    frame_image = pygame.surfarray.array3d(screen)
-                    frame_image = np.transpose(frame_image, (1, 0, 2))
+                if self.envelope is None:
+                    self.envelope = load_envelope(self.audio_file, spectrum=(PREVIEW_FPS, WAVEFORM_SAMPLES))
+
+                # Snapshot render settings so worker processes see the same values
+                settings = self.render_settings()
+
+                # Re-chunk the finished transcription in case Max Words changed since the preview;
+                # while it is still streaming, export renders from the live store and waits as needed
+                export_segments = self.segment_store
+                if self.transcription is not None:
+                    export_segments = chunk_segments(self.transcription, self.max_words_var.get())
+
+                # Soft subtitles are muxed as a stream; burned ones are drawn into every frame
+                subtitles = self.export_subtitles_var.get()
+                soft_subtitles = None
+                if subtitles == "soft":
+                    soft_subtitles = self.subtitle_builder(export_segments, "ass")
+
+                export_video_file(
+                    self.audio_file, output_path, export_segments if subtitles == "burn" else None, settings,
+                    workers=self.export_workers_var.get(),
+                    chunk_seconds=self.export_chunk_var.get(),
+                    envelope=self.envelope, profile=profile, soft_subtitles=soft_subtitles,
+                    checkpoint=bool(self.export_checkpoint_var.get())
+                )
 
-                    writer.append_data(frame_image)
-
-                writer.close()
+                self.progress.stop()
 
-                # Merge audio and video using imageio_ffmpeg
-                final_output = output_path
-                temp_video_file = output_path + '_video_only.mp4'
-                os.rename(output_path, temp_video_file)
-
-                ffmpeg_exe = get_ffmpeg_exe()
-
-                # Command to merge audio and video
-                merge_cmd = [
-                    ffmpeg_exe,
-                    '-y',
-                    '-i', temp_video_file,
-                    '-i', temp_audio_file.name,
-                    '-c:v', 'copy',
-                    '-c:a', 'aac',
-                    '-strict', 'experimental',
-                    '-b:a', '192k',
-                    final_output
-                ]
+                messagebox.showinfo("Export", f"Exported video to {output_path}!")
+            except Exception as e:
+                self.progress.stop()
+                messagebox.showerror("Error", f"An error occurred during export: {e}")
 
-                subprocess.run(merge_cmd, check=True)
+    def subtitle_builder(self, segments, fmt):
+        # Returns settings -> subtitle document; Tk variables are read now, not when it is called
+        if fmt == "ass" and self.karaoke_var.get():
+            if self.transcription is None:
+                raise ValueError("Karaoke subtitles need a finished transcription")
+            transcription, words_per_chunk = self.transcription, self.max_words_var.get()
+            return lambda settings: karaoke_ass(transcription, words_per_chunk, settings)
+        return lambda settings: subtitle_text(segments, fmt, settings)
+
+    def save_subtitles(self):
+        if self.transcription is None:
+            messagebox.showerror("Error", "Preview the audio file first so it is transcribed.")
+            return
+        output_path = filedialog.asksaveasfilename(defaultextension=".srt", filetypes=[("SubRip", "*.srt"), ("WebVTT", "*.vtt"), ("Advanced SubStation Alpha", "*.ass")])
+        if output_path:
+            try:
+                fmt = os.path.splitext(output_path)[1].lower().lstrip(".")
+                if fmt not in SUBTITLE_FORMATS:
+                    raise ValueError(f"Unknown subtitle format: {fmt}")
+                segments = chunk_segments(self.transcription, self.max_words_var.get())
+                text = self.subtitle_builder(segments, fmt)(self.render_settings())
+                with open(output_path, "w", encoding="utf-8") as f:
+                    f.write(text)
+                messagebox.showinfo("Subtitles", f"Saved subtitles to {output_path}!")
+            except Exception as e:
+                messagebox.showerror("Error", f"An error occurred while saving subtitles: {e}")
+
+
+def timed_transcribe(path, store, max_words, transcriber, cache, stream):
+    # Returns (seconds, word-level result)
+    started = time.perf_counter()
+    result = fill_segment_store(path, store, max_words, transcriber, cache, stream)
+    return time.perf_counter() - started, result
+
+
+def subtitle_document(args, fmt, store, transcription, settings):
+    # Subtitles of one job as fmt; with --karaoke an ASS document gets word-level karaoke
+    # lines from the transcription future's word timestamps
+    if fmt == "ass" and args.karaoke:
+        return karaoke_ass(transcription.result()[1], args.max_words, settings)
+    return subtitle_text(store, fmt, settings)
+
+
+def export_job(input_path, output_path, store, transcription, settings, profile, args, **options):
+    # Exports one job with its subtitle mode, then writes the sidecar subtitle file if asked
+    # for. Returns the export timings and the sidecar path.
+    soft_subtitles = None
+    if args.subtitles == "soft":
+        soft_subtitles = lambda frame_settings: subtitle_document(args, "ass", store, transcription, frame_settings)
+    timings = export_video_file(
+        input_path, output_path, store if args.subtitles == "burn" else None, settings,
+        workers=args.workers, chunk_seconds=args.chunk_seconds, profile=profile,
+        soft_subtitles=soft_subtitles, checkpoint=args.checkpoint, **options
+    )
+
+    subtitle_path = None
+    if args.subtitle_format:
+        subtitle_path = os.path.splitext(output_path)[0] + "." + args.subtitle_format
+        text = subtitle_document(args, args.subtitle_format, store, transcription, settings.replace(width=profile['width'], height=profile['height']))
+        with open(subtitle_path, "w", encoding="utf-8") as f:
+            f.write(text)
+    return timings, subtitle_path
+
+
+def build_settings(args):
+    styles = {style.lower(): style for style in WAVEFORM_STYLES}
+    # Only parsed to reject unknown colors up front; the settings keep the string
+    ImageColor.getrgb(args.subtitle_color)
+    return RenderSettings(
+        style=styles[args.style],
+        amplitude_scale=args.amplitude_scale,
+        window_seconds=RENDER_PROFILES[args.profile]['window_seconds'] if args.window_seconds is None else args.window_seconds,
+        waveform_color=ImageColor.getrgb(args.color)[:3],
+        rainbow=args.rainbow,
+        font=args.font,
+        subtitle_color=args.subtitle_color,
+    )
+
+
+def build_cli_profile(args):
+    width = height = None
+    if args.resolution:
+        try:
+            width, height = (int(value) for value in args.resolution.lower().split("x"))
+        except ValueError:
+            raise ValueError(f"Resolution must look like 1280x720, not {args.resolution}")
+    crf = args.crf if args.crf is not None else QUALITY_LEVELS.get(args.quality)
+    return build_profile(
+        args.profile, width=width, height=height, fps=args.fps,
+        preset=args.preset, crf=crf, threads=args.encoder_threads
+    )
+
+
+def build_transcriber(args):
+    options = {}
+    if args.engine == "faster-whisper":
+        options = {'compute_type': args.compute_type, 'batch_size': args.batch_size}
+    return load_transcriber(args.engine, args.model, args.threads, **options)
+
+
+def collect_batch_jobs(source, output_dir, output_format):
+    # source is either a directory of audio files or a manifest with one input path per line
+    if os.path.isdir(source):
+        inputs = sorted(
+            os.path.join(source, name) for name in os.listdir(source)
+            if name.lower().endswith(AUDIO_EXTENSIONS)
+        )
+    else:
+        base_dir = os.path.dirname(os.path.abspath(source))
+        with open(source) as f:
+            lines = [line.strip() for line in f]
+        inputs = [os.path.join(base_dir, line) for line in lines if line and not line.startswith('#')]
+
+    # Inputs sharing a stem (a.mp3 and a.wav, or one name in two manifest directories)
+    # would write the same output and share its export checkpoint, so their outputs keep
+    # the source extension in the name, plus a counter if that is still taken
+    stems = [os.path.splitext(os.path.basename(input_path))[0] for input_path in inputs]
+    stem_counts = {}
+    for stem in stems:
+        stem_counts[stem.lower()] = stem_counts.get(stem.lower(), 0) + 1
+
+    jobs = []
+    used = set()
+    for input_path, stem in zip(inputs, stems):
+        name = stem
+        if stem_counts[stem.lower()] > 1:
+            extension = os.path.splitext(input_path)[1].lstrip('.')
+            name = f"{stem}_{extension}" if extension else stem
+        unique_name = name
+        n = 2
+        while unique_name.lower() in used:
+            unique_name = f"{name}_{n}"
+            n += 1
+        used.add(unique_name.lower())
+        jobs.append((input_path, os.path.join(output_dir, f"{unique_name}.{output_format}")))
+    return jobs
+
+
+def format_timings(timings):
+    # Stage durations, plus render throughput when the frame count is known
+    parts = [f"{stage} {seconds:.2f}s" for stage, seconds in timings.items() if stage != 'frames']
+    if timings.get('frames') and timings.get('render'):
+        parts.append(f"{timings['frames'] / timings['render']:.0f} frames/s")
+    return ", ".join(parts)
+
+
+def run_jobs(jobs, args):
+    # Transcription of the next file runs on a background thread while the current one renders.
+    # With --stream, rendering of the current file also starts before its transcription ends.
+    settings = build_settings(args)
+    profile = build_cli_profile(args)
+    cache = None if args.no_cache else TranscriptCache(args.cache_dir)
+    failures = 0
+    totals = {}
+
+    def submit(input_path):
+        store = SegmentStore(complete=False)
+        future = prefetcher.submit(timed_transcribe, input_path, store, args.max_words, transcriber, cache, args.stream)
+        return store, future
+
+    transcriber = build_transcriber(args)
+    with ThreadPoolExecutor(max_workers=1) as prefetcher:
+        pending = submit(jobs[0][0]) if jobs else None
+        for index, (input_path, output_path) in enumerate(jobs):
+            store, transcription = pending
+            if index + 1 < len(jobs):
+                pending = submit(jobs[index + 1][0])
 
-                # Cleanup temporary files
-                os.remove(temp_video_file)
-                os.remove(temp_audio_file.name)
+            try:
+                if not args.stream:
+                    transcription.result()
+                export_timings, _ = export_job(input_path, output_path, store, transcription, settings, profile, args, show_progress=not args.quiet)
+                timings = {'transcribe': transcription.result()[0], **export_timings}
+            except Exception as e:
+                failures += 1
+                print(f"{input_path}: failed: {e}", file=sys.stderr)
+                continue
+
+            for stage, seconds in timings.items():
+                totals[stage] = totals.get(stage, 0.0) + seconds
+            print(f"{input_path} -> {output_path}: {format_timings(timings)}")
+
+    if len(jobs) > 1:
+        print(f"Total ({len(jobs) - failures}/{len(jobs)} files): {format_timings(totals)}")
+    return 1 if failures else 0
+
+
+JOBS_DIR = os.path.join(CACHE_DIR, "jobs")
+
+# Options a submitted job may set, with their types; everything else comes from the
+# serve command line
+JOB_OPTIONS = {
+    'style': str, 'color': str, 'rainbow': bool, 'amplitude_scale': float, 'window_seconds': float,
+    'font': str, 'subtitle_color': str, 'max_words': int, 'quality': str,
+    'profile': str, 'resolution': str, 'fps': int, 'preset': str, 'crf': int,
+    'engine': str, 'model': str, 'stream': bool, 'workers': int,
+    'subtitles': str, 'subtitle_format': str, 'karaoke': bool,
+}
+JOB_POSITIVE_OPTIONS = {'max_words', 'workers', 'window_seconds'}
+
+
+def job_option(key, value):
+    # JSON values are type-checked rather than cast: bool("false") is True and int(2.5) is 2.
+    # Whole numbers are accepted where a float is expected.
+    kind = JOB_OPTIONS[key]
+    accepted = (int, float) if kind is float else kind
+    if isinstance(value, bool) != (kind is bool) or not isinstance(value, accepted):
+        raise ValueError(f"{key} must be a {kind.__name__}, not {json.dumps(value)}")
+    if key in JOB_POSITIVE_OPTIONS and not value > 0:
+        raise ValueError(f"{key} must be positive, not {value}")
+    return kind(value)
+
+
+class EncodeSlots:
+    # Hands out CPU cores to running exports so concurrent jobs never start more
+    # encoder processes than the machine has cores
+    def __init__(self, total):
+        self.total = total
+        self.free = total
+        self.condition = threading.Condition()
+
+    def acquire(self, count):
+        count = max(1, min(count, self.total))
+        with self.condition:
+            while self.free < count:
+                self.condition.wait()
+            self.free -= count
+        return count
+
+    def release(self, count):
+        with self.condition:
+            self.free += count
+            self.condition.notify_all()
+
+
+class JobQueue:
+    # Render jobs for the local server. Each job is a JSON file in jobs_dir, so the queue
+    # survives restarts; jobs that were queued or running when the server stopped are
+    # queued again on startup.
+    def __init__(self, args, jobs_dir=JOBS_DIR):
+        self.defaults = args
+        self.jobs_dir = jobs_dir
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.pending = queue.Queue()
+        self.slots = EncodeSlots(os.cpu_count() or 1)
+        self.cache = None if args.no_cache else TranscriptCache(args.cache_dir)
+        os.makedirs(jobs_dir, exist_ok=True)
+        self.load()
+
+    def load(self):
+        jobs = []
+        for name in os.listdir(self.jobs_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.jobs_dir, name)) as f:
+                    jobs.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+
+        with self.lock:
+            for job in sorted(jobs, key=lambda job: job['created']):
+                self.jobs[job['id']] = job
+                if job['status'] in ("queued", "running"):
+                    job.update(status="queued", started=None, progress=0.0, frames_done=0, timings={})
+                    self.save(job)
+                    self.pending.put(job['id'])
+
+    def save(self, job):
+        # Called with self.lock held
+        path = os.path.join(self.jobs_dir, f"{job['id']}.json")
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(job, f)
+        os.replace(temp_path, path)
+
+    def job_args(self, options):
+        args = argparse.Namespace(**vars(self.defaults))
+        for key, value in options.items():
+            setattr(args, key, value)
+        return args
+
+    def submit(self, payload):
+        # Validates and queues a job; raises ValueError for one that could never run
+        input_path = payload.get('input')
+        if not isinstance(input_path, str) or not os.path.isfile(input_path):
+            raise ValueError(f"Input file not found: {input_path}")
+        unknown = set(payload) - set(JOB_OPTIONS) - {'input', 'output'}
+        if unknown:
+            raise ValueError(f"Unknown options: {', '.join(sorted(unknown))}")
 
-                self.progress.stop()
+        try:
+            options = {key: job_option(key, payload[key]) for key in JOB_OPTIONS if key in payload}
+            args = self.job_args(options)
+            build_cli_profile(args)
+            build_settings(args)
+        except KeyError:
+            raise ValueError(f"Unknown style: {payload.get('style')}")
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid job options: {e}")
+        if args.quality is not None and args.quality not in QUALITY_LEVELS:
+            raise ValueError(f"Unknown quality: {args.quality}")
+        if args.engine not in TRANSCRIPTION_ENGINES:
+            raise ValueError(f"Unknown engine: {args.engine}")
+        if args.subtitles not in SUBTITLE_MODES:
+            raise ValueError(f"Unknown subtitle mode: {args.subtitles}")
+        if args.subtitle_format is not None and args.subtitle_format not in SUBTITLE_FORMATS:
+            raise ValueError(f"Unknown subtitle format: {args.subtitle_format}")
+
+        job_id = uuid.uuid4().hex[:12]
+        output_path = payload.get('output')
+        if output_path is not None and not isinstance(output_path, str):
+            raise ValueError(f"output must be a str, not {json.dumps(output_path)}")
+        if not output_path:
+            stem = os.path.splitext(os.path.basename(input_path))[0]
+            output_path = os.path.join(self.defaults.output_dir, f"{stem}-{job_id}.mp4")
+        if args.subtitles == "soft":
+            soft_subtitle_codec(output_path)
+
+        job = {
+            'id': job_id,
+            'status': "queued",
+            'input': os.path.abspath(input_path),
+            'output': os.path.abspath(output_path),
+            'options': options,
+            'created': time.time(),
+            'started': None,
+            'finished': None,
+            'progress': 0.0,
+            'frames_done': 0,
+            'total_frames': None,
+            'timings': {},
+            'subtitle_file': None,
+            'error': None,
+        }
+        with self.lock:
+            self.jobs[job_id] = job
+            self.save(job)
+        self.pending.put(job_id)
+        return self.get(job_id)
+
+    def get(self, job_id):
+        # Copies, so callers can serialize a job while a worker updates it
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return json.loads(json.dumps(job)) if job else None
+
+    def list(self):
+        with self.lock:
+            return json.loads(json.dumps(sorted(self.jobs.values(), key=lambda job: job['created'])))
+
+    def cancel(self, job_id):
+        # Only queued jobs can be cancelled; returns the job, or None if it does not exist
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None and job['status'] == "queued":
+                job.update(status="cancelled", finished=time.time())
+                self.save(job)
+        return self.get(job_id)
+
+    def start(self, workers):
+        for _ in range(max(1, workers)):
+            threading.Thread(target=self.work, daemon=True).start()
+
+    def work(self):
+        while True:
+            job_id = self.pending.get()
+            with self.lock:
+                job = self.jobs.get(job_id)
+                if job is None or job['status'] != "queued":
+                    continue
+                job.update(status="running", started=time.time())
+                job['timings']['queued'] = job['started'] - job['created']
+                self.save(job)
 
-                messagebox.showinfo("Export", f"Exported video to {final_output}!")
+            try:
+                self.run(job)
+                status, error = "done", None
             except Exception as e:
-                self.progress.stop()
-                messagebox.showerror("Error", f"An error occurred during export: {e}")
+                status, error = "failed", str(e)
+
+            with self.lock:
+                job.update(status=status, error=error, finished=time.time())
+                job['timings']['total'] = job['finished'] - job['started']
+                self.save(job)
+
+    def run(self, job):
+        args = self.job_args(job['options'])
+        settings = build_settings(args)
+        profile = build_cli_profile(args)
+        # Engines are shared per configuration, so models stay loaded between jobs
+        transcriber = build_transcriber(args)
+        store = SegmentStore(complete=False)
+        os.makedirs(os.path.dirname(job['output']), exist_ok=True)
+
+        def progress(frames_done, total_frames):
+            with self.lock:
+                job.update(frames_done=frames_done, total_frames=total_frames, progress=round(frames_done / max(1, total_frames), 4))
+
+        with ThreadPoolExecutor(max_workers=1) as transcription_pool:
+            transcription = transcription_pool.submit(timed_transcribe, job['input'], store, args.max_words, transcriber, self.cache, args.stream)
+            if not args.stream:
+                transcription.result()
+
+            # Wait for free cores before encoding
+            started = time.perf_counter()
+            cores = self.slots.acquire(args.workers)
+            encode_wait = time.perf_counter() - started
+            # args is this job's own namespace. Jobs always checkpoint: one interrupted by a
+            # crash or restart is queued again and resumes from its finished segments.
+            args.workers = cores
+            args.checkpoint = True
+            try:
+                export_timings, subtitle_path = export_job(
+                    job['input'], job['output'], store, transcription, settings, profile, args,
+                    show_progress=False, progress=progress
+                )
+            finally:
+                self.slots.release(cores)
+            timings = {'transcribe': transcription.result()[0], 'encode_wait': encode_wait, **export_timings}
+
+        with self.lock:
+            job['timings'].update(timings)
+            job['subtitle_file'] = subtitle_path
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    # POST /jobs queues a job, GET /jobs lists them, GET /jobs/<id> shows one and
+    # DELETE /jobs/<id> cancels a queued one. Bodies are JSON.
+    server_version = "WhisperVisualizer"
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def route(self):
+        # Returns (matched, job_id): (True, None) for /jobs, (True, id) for /jobs/<id>
+        parts = self.path.split("?", 1)[0].strip("/").split("/")
+        if parts[0] != "jobs" or len(parts) > 2:
+            return False, None
+        return True, parts[1] if len(parts) == 2 else None
+
+    def do_GET(self):
+        matched, job_id = self.route()
+        if not matched:
+            return self.send_json(404, {'error': "Not found"})
+        if job_id is None:
+            return self.send_json(200, {'jobs': self.server.jobs.list()})
+        job = self.server.jobs.get(job_id)
+        if job is None:
+            return self.send_json(404, {'error': f"No job {job_id}"})
+        self.send_json(200, job)
+
+    def do_POST(self):
+        matched, job_id = self.route()
+        if not matched or job_id is not None:
+            return self.send_json(404, {'error': "Not found"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(payload, dict):
+                raise ValueError("Expected a JSON object")
+            job = self.server.jobs.submit(payload)
+        except ValueError as e:
+            return self.send_json(400, {'error': str(e)})
+        self.send_json(201, job)
+
+    def do_DELETE(self):
+        matched, job_id = self.route()
+        if not matched or job_id is None:
+            return self.send_json(404, {'error': "Not found"})
+        job = self.server.jobs.cancel(job_id)
+        if job is None:
+            return self.send_json(404, {'error': f"No job {job_id}"})
+        if job['status'] != "cancelled":
+            return self.send_json(409, {'error': f"Job {job_id} is {job['status']}", 'job': job})
+        self.send_json(200, job)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def serve(args):
+    # There is no authentication, so the server only listens on loopback unless told otherwise
+    jobs = JobQueue(args, args.jobs_dir)
+    jobs.start(args.job_workers)
+    httpd = ThreadingHTTPServer((args.host, args.port), JobRequestHandler)
+    httpd.jobs = jobs
+    httpd.quiet = args.quiet
+    print(f"Accepting render jobs at http://{args.host}:{httpd.server_port}/jobs", file=sys.stderr)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+    return 0
+
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+def positive_float(value):
+    number = float(value)
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f"must be above 0, got {value}")
+    return number
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="whispervisualizer", description="Waveform visualizer with Whisper subtitles. Run without a command to open the GUI.")
+    subparsers = parser.add_subparsers(dest="command")
+
+    render_parser = subparsers.add_parser("render", help="Transcribe and export a single audio file")
+    render_parser.add_argument("input", help="Input audio file")
+    render_parser.add_argument("output", help="Output video file")
+
+    batch_parser = subparsers.add_parser("batch", help="Transcribe and export every file in a directory or manifest")
+    batch_parser.add_argument("source", help="Directory of audio files, or a manifest with one input path per line")
+    batch_parser.add_argument("output_dir", help="Directory for the exported videos")
+    batch_parser.add_argument("--format", default="mp4", choices=["mp4", "avi", "mkv"], help="Output container")
+
+    serve_parser = subparsers.add_parser("serve", help="Run a local HTTP server that queues and renders jobs; the options below are the job defaults")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument("--jobs-dir", default=JOBS_DIR, help="Where queued and finished jobs are kept")
+    serve_parser.add_argument("--job-workers", type=int, default=2, help="Jobs processed at the same time")
+    serve_parser.add_argument("--output-dir", default=".", help="Output directory for jobs that do not name an output file")
+
+    for sub in (render_parser, batch_parser, serve_parser):
+        sub.add_argument("--style", default="line", choices=[style.lower() for style in WAVEFORM_STYLES])
+        sub.add_argument("--color", default="#00FF00", help="Waveform color")
+        sub.add_argument("--rainbow", action="store_true", help="Enable the rainbow effect")
+        sub.add_argument("--amplitude-scale", type=float, default=1.0)
+        sub.add_argument("--window-seconds", type=positive_float, help="Seconds of audio shown across the canvas (default: from the profile)")
+        sub.add_argument("--font", default="Arial", help="Subtitle font")
+        sub.add_argument("--subtitle-color", default="#00FF00")
+        sub.add_argument("--max-words", type=positive_int, default=10, help="Max words per subtitle")
+        sub.add_argument("--subtitles", default="burn", choices=SUBTITLE_MODES, help="Draw subtitles into the frames, mux them as a soft subtitle stream (MP4/MOV/MKV), or leave them out")
+        sub.add_argument("--subtitle-format", choices=SUBTITLE_FORMATS, help="Also write the subtitles next to each video in this format")
+        sub.add_argument("--karaoke", action="store_true", help="Word-level karaoke lines in ASS output (MKV soft subtitles and .ass files)")
+        sub.add_argument("--profile", default=DEFAULT_PROFILE, choices=list(RENDER_PROFILES), help="Render tier: frame size, fps and encoder settings")
+        sub.add_argument("--resolution", help=f"Override the profile's frame size, e.g. 1280x720 (up to {MAX_RESOLUTION[0]}x{MAX_RESOLUTION[1]})")
+        sub.add_argument("--fps", type=int, help="Override the profile's frame rate")
+        sub.add_argument("--preset", choices=X264_PRESETS, help="Override the profile's x264 preset")
+        sub.add_argument("--crf", type=int, help="Override the profile's x264 CRF (lower is better)")
+        sub.add_argument("--encoder-threads", type=int, help="x264 threads per encoder (0 = automatic)")
+        sub.add_argument("--quality", choices=list(QUALITY_LEVELS), help="Shorthand for a CRF: High 18, Medium 23, Low 28")
+        sub.add_argument("--engine", default="whisper", choices=list(TRANSCRIPTION_ENGINES), help="Transcription engine")
+        sub.add_argument("--model", default="base", help=f"Whisper model size ({', '.join(WHISPER_MODEL_SIZES)}) or path")
+        sub.add_argument("--threads", type=int, default=0, help="CPU threads for transcription (0 = engine default)")
+        sub.add_argument("--compute-type", default="int8", help="faster-whisper weight type, e.g. int8, int8_float32, float32")
+        sub.add_argument("--batch-size", type=int, default=1, help="faster-whisper batched inference size (1 = sequential)")
+        sub.add_argument("--cache-dir", default=TRANSCRIPT_CACHE_DIR, help="Transcription cache directory")
+        sub.add_argument("--no-cache", action="store_true", help="Always re-run Whisper")
+        sub.add_argument("--stream", action="store_true", help="Transcribe in 30 s windows and start rendering before transcription finishes")
+        sub.add_argument("--workers", type=int, default=1, help="Export worker processes")
+        sub.add_argument("--chunk-seconds", type=int, default=60, help="Timeline chunk length for parallel and checkpointed export")
+        sub.add_argument("--checkpoint", action="store_true", help="Keep finished chunks so an interrupted export resumes where it stopped when run again")
+        sub.add_argument("--quiet", action="store_true", help="Hide the per-frame progress bar")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.command is None:
+        app = WaveformApp()
+        app.mainloop()
+        return 0
+
+    # Bad render options are usage errors, reported before any file is transcribed
+    try:
+        build_settings(args)
+        build_cli_profile(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.command == "serve":
+        return serve(args)
+
+    if args.command == "render":
+        jobs = [(args.input, args.output)]
+    else:
+        os.makedirs(args.output_dir, exist_ok=True)
+        jobs = collect_batch_jobs(args.source, args.output_dir, args.format)
+        if not jobs:
+            print(f"No audio files found in {args.source}", file=sys.stderr)
+            return 1
+
+    return run_jobs(jobs, args)
+
 
 if __name__ == "__main__":
-    app = WaveformApp()
-    app.mainloop()
+    sys.exit(main())